@@ -17,12 +17,26 @@ See the 'Arrival generation algorithms' and 'Elevator moving algorithsm'
 sections of the assignment handout for a complete description of each algorithm
 you are expected to implement in this file.
 """
+from bisect import bisect_left, bisect_right, insort
 import csv
 from enum import Enum
+import mmap
 import random
-from typing import Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, \
+    Sequence, Tuple, Type
 
-from entities import Person, Elevator
+from entities import Person, PersonStore, Elevator, WaitingQueues
+import traces
+
+
+def seeded_rng(seed: Any, stream: str) -> random.Random:
+    """Return a new random.Random for the stream named <stream> of the master
+    seed <seed>.
+
+    The same seed and stream name always give the same random numbers, and
+    streams with different names are independent of each other.
+    """
+    return random.Random(f'{seed}/{stream}')
 
 
 ###############################################################################
@@ -37,6 +51,9 @@ class ArrivalGenerator:
                beyond this floor.
     num_people: The number of people to generate, or None if this is left
                 up to the algorithm itself.
+    rng: The source of all random numbers drawn by this generator.
+    store: The PersonStore generated people are allocated in. A simulation
+           gives its generator the simulation's own store.
 
     === Representation Invariants ===
     max_floor >= 2
@@ -44,15 +61,23 @@ class ArrivalGenerator:
     """
     max_floor: int
     num_people: Optional[int]
+    rng: random.Random
+    store: PersonStore
 
-    def __init__(self, max_floor: int, num_people: Optional[int]) -> None:
+    def __init__(self, max_floor: int, num_people: Optional[int],
+                 rng: Optional[random.Random] = None) -> None:
         """Initialize a new ArrivalGenerator.
 
+        Random numbers are drawn from <rng>, or from a new unseeded
+        random.Random if <rng> is None.
+
         Preconditions:
             max_floor >= 2
             num_people is None or num_people >= 0
         """
         self.max_floor = max_floor
+        self.rng = random.Random() if rng is None else rng
+        self.store = PersonStore()
         if num_people is not None and num_people > max_floor:
             self.num_people = max_floor
         else:
@@ -68,6 +93,15 @@ class ArrivalGenerator:
         """
         raise NotImplementedError
 
+    def next_arrival(self, round_num: int) -> Optional[int]:
+        """Return the first round at or after <round_num> at which people
+        may arrive, or None if nobody arrives from <round_num> on.
+
+        Rounds before the returned one must have no arrivals, so an engine
+        may skip generating them. By default every round may have arrivals.
+        """
+        return round_num
+
 
 class RandomArrivals(ArrivalGenerator):
     """Generate a fixed number of random people each round.
@@ -81,90 +115,257 @@ class RandomArrivals(ArrivalGenerator):
     Hint: look up the 'sample' function from random.
     """
 
+    def next_arrival(self, round_num: int) -> Optional[int]:
+        """Return <round_num> if people arrive every round, or None if they
+        never do.
+        """
+        return round_num if self.num_people else None
+
     def generate(self, round_num: int) -> Dict[int, List[Person]]:
         people = {}
 
         if self.num_people is not None:
-            start_floors = random.sample(
+            start_floors = self.rng.sample(
                 range(1, self.max_floor+1), self.num_people)
             target_floors = []
             for floor in start_floors:
-                target = random.randint(1, self.max_floor)
+                target = self.rng.randint(1, self.max_floor)
                 while target == floor:
-                    target = random.randint(1, self.max_floor)
+                    target = self.rng.randint(1, self.max_floor)
                 target_floors.append(target)
             for i in range(len(start_floors)):
                 if start_floors[i] in people:
                     people[start_floors[i]].append(
-                        Person(start_floors[i], target_floors[i]))
+                        Person(start_floors[i], target_floors[i],
+                               self.store))
                 else:
                     people[start_floors[i]] = [Person(
-                        start_floors[i], target_floors[i])]
+                        start_floors[i], target_floors[i], self.store)]
         return people
 
 
 class FileArrivals(ArrivalGenerator):
     """Generate arrivals from a CSV file.
 
+    Each line of the file is a round number followed by pairs of start and
+    target floors, one pair per person arriving in that round. Several lines
+    may share a round, and their arrivals are combined in file order.
+
+    By default the whole file is read when the generator is created. In
+    streaming mode the file is instead read lazily, one line ahead of the
+    round being generated, so that traces much larger than memory can be
+    replayed. Streaming requires the lines to be sorted by round.
+
     === Attributes ===
     arrival_sequence: a dictionary mapping round number to a list of
                       arrival data, where the even indices (0, 2, 4 ...) represent
                       the arrival floor number, and the odd indices (1, 3, 5 ...)
-                      represent the target floor number.
+                      represent the target floor number. This is empty in
+                      streaming mode.
+    filename: the CSV file arrivals are read from
+
+    === Private Attributes ===
+    _rows: in streaming mode, the remaining lines of the file as
+           (round, arrival data) pairs, or None otherwise
+    _next_row: in streaming mode, the next line of the file that has been
+               read but not generated yet, or None if there is none
+    _last_round: in streaming mode, the round of the last line read
+    _rounds: the keys of arrival_sequence in increasing order, or None if
+             they have not been sorted yet
     """
     arrival_sequence: Dict[int, List[int]]
-
-    def __init__(self, max_floor: int, filename: str) -> None:
+    filename: str
+    _rows: Optional[Iterator[Tuple[int, List[int]]]]
+    _next_row: Optional[Tuple[int, List[int]]]
+    _last_round: int
+    _rounds: Optional[List[int]]
+
+    def __init__(self, max_floor: int, filename: str,
+                 stream: bool = False) -> None:
         """Initialize a new FileArrivals algorithm from the given file.
 
         The num_people attribute of every FileArrivals instance is set to None,
         since the number of arrivals depends on the given file.
 
+        If <stream> is True, the file is read lazily as rounds are generated.
+
         Precondition:
             <filename> refers to a valid CSV file, following the specified
             format and restrictions from the assignment handout.
         """
         ArrivalGenerator.__init__(self, max_floor, None)
+        self.filename = filename
+        self.arrival_sequence = {}
+        self._rows = None
+        self._next_row = None
+        self._last_round = 0
+        self._rounds = None
 
-        # We've provided some of the "reading from csv files" boilerplate code
-        # for you to help you get started.
+        if stream:
+            self._rows = self._read_rows()
+            self._next_row = next(self._rows, None)
+            return
 
-        self.arrival_sequence = {}
-        with open(filename) as csvfile:
-            reader = csv.reader(csvfile)
-            for line in reader:
-                # to one line of the original file.
-                # You'll need to convert the strings to ints and then process
-                # and store them.
-                int_list = []
-                for item in line:
-                    int_list.append(int(item))
-                self.arrival_sequence[int_list[0]] = int_list[1:]
-
-    def generate(self, round_num: int) -> Dict:
+        for round_num, sequence in self._read_rows():
+            self.arrival_sequence.setdefault(round_num, []).extend(sequence)
+
+    def generate(self, round_num: int) -> Dict[int, List[Person]]:
         """A method to generate new arrivals for each turn, based
         on the sequence provided by the file.
+
+        Precondition: in streaming mode, generate is called with increasing
+        round numbers.
         """
-        people = {}
-        start_floor = []
-        target_floor = []
-        if round_num in self.arrival_sequence:
-            sequence = self.arrival_sequence[round_num]
-            for i in range(0, len(sequence), 2):
-                start_floor.append(sequence[i])
-                target_floor.append(sequence[i+1])
-
-            for i in range(len(start_floor)):
-                if start_floor[i] in people:
-                    people[start_floor[i]].append(
-                        Person(start_floor[i], target_floor[i]))
-                else:
-                    people[start_floor[i]] = [Person(
-                        start_floor[i], target_floor[i])]
+        if self._rows is None:
+            return _people_from_sequence(
+                self.arrival_sequence.get(round_num, []), self.store)
+
+        sequence = []
+        # Lines for rounds that are never generated are skipped.
+        while self._next_row is not None and self._next_row[0] <= round_num:
+            row_round, row_sequence = self._next_row
+            if row_round == round_num:
+                sequence.extend(row_sequence)
+            self._next_row = next(self._rows, None)
+        return _people_from_sequence(sequence, self.store)
+
+    def next_arrival(self, round_num: int) -> Optional[int]:
+        """Return the first round at or after <round_num> that has a line in
+        the file, or None if there is none.
+
+        In streaming mode, lines before <round_num> that have not been
+        generated yet are only skipped by the next call to generate.
+        """
+        if self._rows is not None:
+            if self._next_row is None:
+                return None
+            return max(self._next_row[0], round_num)
+        if self._rounds is None:
+            self._rounds = sorted(self.arrival_sequence)
+        i = bisect_left(self._rounds, round_num)
+        return self._rounds[i] if i < len(self._rounds) else None
+
+    def _read_rows(self) -> Iterator[Tuple[int, List[int]]]:
+        """Yield the round number and arrival data of each line of the file.
+
+        In streaming mode, raise ValueError when a line's round is before the
+        round of the line above it.
+        """
+        with open(self.filename) as csvfile:
+            for line in csv.reader(csvfile):
+                int_list = [int(item) for item in line]
+                if self._rows is not None:
+                    if int_list[0] < self._last_round:
+                        raise ValueError(
+                            f'{self.filename}: round {int_list[0]} appears '
+                            f'after round {self._last_round}; streaming '
+                            f'requires lines sorted by round')
+                    self._last_round = int_list[0]
+                yield int_list[0], int_list[1:]
+
+
+class MappedFileArrivals(ArrivalGenerator):
+    """Generate arrivals from a binary trace file (see traces.py).
+
+    The trace is memory-mapped rather than read, so creating this generator
+    takes the same time however large the trace is, and each round's
+    arrivals are zero-copy slices of the mapped file. Traces are
+    little-endian wherever they were written, so on a big-endian machine
+    the columns are instead read into byteswapped copies.
+
+    === Attributes ===
+    filename: the trace file arrivals are read from
+    num_arrivals: the total number of arrivals in the trace
+    max_round: the largest round with arrivals in the trace
+
+    === Private Attributes ===
+    _map: the memory-mapped trace file
+    _offsets: the round index of the trace
+    _starts: the start floor of every arrival, sorted by round
+    _targets: the target floor of every arrival, sorted by round
+    """
+    filename: str
+    num_arrivals: int
+    max_round: int
+    _map: mmap.mmap
+    _offsets: Sequence[int]
+    _starts: Sequence[int]
+    _targets: Sequence[int]
+
+    def __init__(self, max_floor: int, filename: str) -> None:
+        """Initialize a new MappedFileArrivals algorithm from the given trace.
+
+        Raise ValueError if <filename> is not an arrival trace.
+        """
+        ArrivalGenerator.__init__(self, max_floor, None)
+        self.filename = filename
+        with open(filename, 'rb') as trace:
+            self._map = mmap.mmap(trace.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self._map)
+        self.num_arrivals, self.max_round = traces.read_header(data)
+        index, rounds, starts, targets = traces.column_offsets(
+            self.num_arrivals, self.max_round)
+        end = targets + 4 * self.num_arrivals
+        if len(data) < end:
+            raise ValueError(f'{filename}: truncated arrival trace')
+        self._offsets = traces.read_column(data[index:rounds], 'Q')
+        self._starts = traces.read_column(data[starts:targets], 'i')
+        self._targets = traces.read_column(data[targets:end], 'i')
+
+    def arrivals(self, round_num: int) -> Tuple[Sequence[int], Sequence[int]]:
+        """Return the start floors and target floors of the people arriving
+        at <round_num>, as views into the mapped trace (or slices of its
+        copied columns on a big-endian machine).
+        """
+        if not 0 <= round_num <= self.max_round:
+            return self._starts[0:0], self._targets[0:0]
+        lo = self._offsets[round_num]
+        hi = self._offsets[round_num + 1]
+        return self._starts[lo:hi], self._targets[lo:hi]
+
+    def next_arrival(self, round_num: int) -> Optional[int]:
+        """Return the first round at or after <round_num> with arrivals in
+        the trace, or None if there is none.
+        """
+        round_num = max(round_num, 0)
+        if round_num > self.max_round:
+            return None
+        # The last round whose arrivals start where round_num's do has
+        # arrivals, unless it is past the end of the index.
+        last = bisect_right(self._offsets, self._offsets[round_num]) - 1
+        return last if last <= self.max_round else None
 
+    def generate(self, round_num: int) -> Dict[int, List[Person]]:
+        """Return the people arriving at <round_num>, grouped by start floor.
+        """
+        people = {}
+        for start, target in zip(*self.arrivals(round_num)):
+            person = Person(start, target, self.store)
+            if start in people:
+                people[start].append(person)
+            else:
+                people[start] = [person]
         return people
 
 
+def _people_from_sequence(sequence: List[int], store: PersonStore
+                          ) -> Dict[int, List[Person]]:
+    """Return the people described by <sequence>, allocated in <store> and
+    grouped by start floor.
+
+    The even indices of <sequence> are start floors and the odd indices are
+    the matching target floors.
+    """
+    people = {}
+    for i in range(0, len(sequence), 2):
+        person = Person(sequence[i], sequence[i + 1], store)
+        if sequence[i] in people:
+            people[sequence[i]].append(person)
+        else:
+            people[sequence[i]] = [person]
+    return people
+
+
 ###############################################################################
 # Elevator moving algorithms
 ###############################################################################
@@ -175,6 +376,9 @@ class Direction(Enum):
 
     The possible values you'll use in your Python code are:
         Direction.UP, Direction.DOWN, Direction.STAY
+
+    A direction only says which way an elevator moved in a round; the number
+    of floors it moved is its speed.
     """
     UP = 1
     STAY = 0
@@ -183,30 +387,107 @@ class Direction(Enum):
 
 class MovingAlgorithm:
     """An algorithm to make decisions for moving an elevator at each round.
+
+    An algorithm decides how elevators move (move_elevators), which
+    passengers get off an elevator at its current floor (unload_passengers)
+    and which waiting people get on (board_passengers). Subclasses must
+    override move_elevators; by default everyone whose target is the current
+    floor gets off, and people get on in the order they arrived.
+
+    An algorithm that rests when idle keeps every stopped, empty elevator
+    where it is while nobody is waiting, without changing any of its own
+    state; an engine may then skip rounds in which nothing happens.
+
+    === Attributes ===
+    rng: The source of all random numbers drawn by this algorithm.
+    rests_when_idle: Whether this algorithm rests when idle.
     """
+    rng: random.Random
+    rests_when_idle: bool = True
+
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        """Initialize a new MovingAlgorithm.
+
+        Random numbers are drawn from <rng>, or from a new unseeded
+        random.Random if <rng> is None.
+        """
+        self.rng = random.Random() if rng is None else rng
+
     def move_elevators(self,
                        elevators: List[Elevator],
-                       waiting: Dict[int, List[Person]],
+                       waiting: Dict[int, Deque[Person]],
                        max_floor: int) -> List[Direction]:
         """Return a list of directions for each elevator to move to.
 
         As input, this method receives the list of elevators in the simulation,
-        a dictionary mapping floor number to a list of people waiting on
+        a dictionary mapping floor number to the queue of people waiting on
         that floor, and the maximum floor number in the simulation.
 
+        The simulation passes its WaitingQueues, whose nonempty_floors and
+        nearest_floor queries avoid scanning every floor.
+
         Note that each returned direction should be valid:
             - An elevator at Floor 1 cannot move down.
             - An elevator at the top floor cannot move up.
         """
         raise NotImplementedError
 
+    def unload_passengers(self, elevator: Elevator) -> List[Person]:
+        """Remove and return the passengers who get off <elevator> at its
+        current floor, in the order they boarded.
+        """
+        return elevator.disembark()
+
+    def board_passengers(self, elevator: Elevator, waiting: WaitingQueues,
+                         space: int) -> List[Person]:
+        """Move up to <space> people waiting on <elevator>'s floor onto
+        <elevator>, and return them.
+        """
+        return waiting.board(elevator, space)
+
+
+# Maps the name of each moving algorithm to its class.
+MOVING_ALGORITHMS: Dict[str, Type[MovingAlgorithm]] = {}
+
+
+def register_moving_algorithm(name: str) -> Callable[[Type[MovingAlgorithm]],
+                                                     Type[MovingAlgorithm]]:
+    """Return a class decorator that registers a moving algorithm under
+    <name> in MOVING_ALGORITHMS.
+
+    Raise ValueError if another algorithm is already registered under
+    <name>.
+    """
+    def register(cls: Type[MovingAlgorithm]) -> Type[MovingAlgorithm]:
+        if MOVING_ALGORITHMS.get(name, cls) is not cls:
+            raise ValueError(f'A moving algorithm named {name!r} is already '
+                             f'registered')
+        MOVING_ALGORITHMS[name] = cls
+        return cls
+    return register
+
+
+def make_moving_algorithm(name: str,
+                          rng: Optional[random.Random] = None
+                          ) -> MovingAlgorithm:
+    """Return a new instance of the moving algorithm registered under <name>.
+
+    Raise ValueError if no algorithm is registered under <name>.
+    """
+    if name not in MOVING_ALGORITHMS:
+        raise ValueError(f'Unknown moving algorithm: {name}')
+    return MOVING_ALGORITHMS[name](rng)
+
 
+@register_moving_algorithm('random')
 class RandomAlgorithm(MovingAlgorithm):
     """A moving algorithm that picks a random direction for each elevator.
     """
+    rests_when_idle = False
+
     def move_elevators(self,
                        elevators: List[Elevator],
-                       waiting: Dict[int, List[Person]],
+                       waiting: Dict[int, Deque[Person]],
                        max_floor: int) -> List[Direction]:
         """Return a list of random valid directions for each elevator.
 
@@ -215,22 +496,17 @@ class RandomAlgorithm(MovingAlgorithm):
         for elevator in elevators:
             bad_direction = True
             while bad_direction:
-                direction = random.randint(-1, 1)
-                if direction == 0:
-                    bad_direction = False
-                    output_directions.append(Direction.STAY)
-                elif direction == -1 and elevator.floor > 1:
-                    bad_direction = False
-                    elevator.floor -= 1
-                    output_directions.append(Direction.DOWN)
-                elif direction == 1 and elevator.floor < max_floor:
+                direction = self.rng.randint(-1, 1)
+                if direction == 0 or \
+                        1 <= elevator.floor + direction <= max_floor:
                     bad_direction = False
-                    elevator.floor += 1
-                    output_directions.append(Direction.UP)
+                    output_directions.append(_move_towards(
+                        elevator, elevator.floor + direction))
 
         return output_directions
 
 
+@register_moving_algorithm('pushy')
 class PushyPassenger(MovingAlgorithm):
     """A moving algorithm that preferences the first passenger on each elevator.
 
@@ -239,46 +515,43 @@ class PushyPassenger(MovingAlgorithm):
 
     If the elevator isn't empty, it moves towards the target floor of the
     *first* passenger who boarded the elevator.
+
+    Passengers also get off in the order they boarded: nobody leaves while
+    someone who boarded before them is still going elsewhere.
     """
     def move_elevators(self,
                        elevators: List[Elevator],
-                       waiting: Dict[int, List[Person]],
+                       waiting: Dict[int, Deque[Person]],
                        max_floor: int) -> List[Direction]:
         """ Return a list of directions based using the pushy passenger
             algorithm
 
         """
+        waiting = _as_queues(waiting)
         output_directions = []
         for elevator in elevators:
-            if len(elevator.passengers) == 0:
-                floors = sorted(waiting)
-                wait_on_floor = []
-                for floor in floors:
-                    if len(waiting[floor]) != 0:
-                        wait_on_floor.append(floor)
-
+            first = elevator.first_passenger()
+            if first is None:
+                wait_on_floor = waiting.nonempty_floors()
                 if len(wait_on_floor) == 0:
-                    output_directions.append(Direction.STAY)
+                    output_directions.append(
+                        _move_towards(elevator, elevator.floor))
                 else:
-                    if wait_on_floor[0] < elevator.floor:
-                        output_directions.append(Direction.DOWN)
-                        elevator.floor -= 1
-
-                    elif wait_on_floor[0] > elevator.floor:
-                        output_directions.append(Direction.UP)
-                        elevator.floor += 1
+                    output_directions.append(
+                        _move_towards(elevator, wait_on_floor[0]))
             else:
-                first = elevator.passengers[0]
-                if elevator.floor < first.target:
-                    output_directions.append(Direction.UP)
-                    elevator.floor += 1
-                elif elevator.floor > first.target:
-                    output_directions.append(Direction.DOWN)
-                    elevator.floor -= 1
+                output_directions.append(_move_towards(elevator, first.target))
 
         return output_directions
 
+    def unload_passengers(self, elevator: Elevator) -> List[Person]:
+        """Remove and return the passengers at the front of the boarding order
+        whose target is <elevator>'s current floor.
+        """
+        return elevator.disembark_front()
+
 
+@register_moving_algorithm('short_sighted')
 class ShortSighted(MovingAlgorithm):
     """A moving algorithm that preferences the closest possible choice.
 
@@ -292,68 +565,453 @@ class ShortSighted(MovingAlgorithm):
     """
     def move_elevators(self,
                        elevators: List[Elevator],
-                       waiting: Dict[int, List[Person]],
+                       waiting: Dict[int, Deque[Person]],
                        max_floor: int) -> List[Direction]:
         """Return a list of directions for each elevators based
         on the ShortSighted algorithm
         """
+        waiting = _as_queues(waiting)
         output_direction = []
         for elevator in elevators:
-            if len(elevator.passengers) == 0:
-                floors = sorted(waiting)
-                wait_on_floor = []
-                distance = []
-                for floor in floors:
-                    if len(waiting[floor]) != 0:
-                        d = abs(elevator.floor - floor)
-                        distance.append(d)
-                        wait_on_floor.append(floor)
-
-                if len(wait_on_floor) == 0:
-                    output_direction.append(Direction.STAY)
+            if elevator.num_passengers() == 0:
+                lower = waiting.nearest_floor(elevator.floor)
+                if lower is None:
+                    output_direction.append(
+                        _move_towards(elevator, elevator.floor))
                 else:
-                    lower = wait_on_floor[distance.index(min(distance))]
-                    if lower < elevator.floor:
-                        output_direction.append(Direction.DOWN)
-                        elevator.floor -= 1
-
-                    elif lower > elevator.floor:
-                        output_direction.append(Direction.UP)
-                        elevator.floor += 1
+                    output_direction.append(_move_towards(elevator, lower))
             else:
-                floors = []
-                distance = []
-                for person in elevator.passengers:
-                    d = abs(elevator.floor - person.target)
-                    distance.append(d)
-                    floors.append(person.target)
-
-                min_floors = []
-                for floor in floors:
-                    if abs(elevator.floor - floor) == min(distance):
-                        min_floors.append(floor)
-                lower = min_floors[0]
-                for floor in min_floors:
-                    if floor < lower:
-                        lower = floor
-
-                if lower < elevator.floor:
-                    output_direction.append(Direction.DOWN)
-                    elevator.floor -= 1
-
-                elif lower > elevator.floor:
-                    output_direction.append(Direction.UP)
-                    elevator.floor += 1
+                output_direction.append(
+                    _move_towards(elevator, elevator.nearest_target()))
 
         return output_direction
 
 
+@register_moving_algorithm('look')
+class LookAlgorithm(MovingAlgorithm):
+    """A collective control (LOOK) moving algorithm.
+
+    Each elevator has a heading. It keeps moving in that direction while
+    there is a request ahead of it: a passenger's target floor, or (if it
+    has room) any floor with someone waiting. When there is nothing left
+    ahead it reverses, and when there are no requests at all it stops and
+    waits, heading nowhere.
+
+    On the way, an elevator only stops for its passengers' target floors
+    and for people going in its direction. If nothing ahead of it goes its
+    way, it heads for the farthest floor ahead with someone going the other
+    way and turns around there. An elevator reverses at a floor to pick up
+    people going the other way only when there is nothing ahead of it, and
+    a stopped elevator picks up the first person in line and takes their
+    direction.
+
+    An elevator without a heading sets off towards the closest request,
+    preferring the lower floor on a tie.
+
+    === Private Attributes ===
+    _heading: maps each elevator to the direction it is heading in: 1 for
+              up, -1 for down, or 0 if it is stopped
+    """
+    _heading: Dict[Elevator, int]
+
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        """Initialize a new LookAlgorithm with every elevator stopped."""
+        MovingAlgorithm.__init__(self, rng)
+        self._heading = {}
+
+    def board_passengers(self, elevator: Elevator, waiting: WaitingQueues,
+                         space: int) -> List[Person]:
+        """Move up to <space> people waiting on <elevator>'s floor and going
+        in its direction onto <elevator>, and return them.
+        """
+        floor = elevator.floor
+        heading = self._heading.get(elevator, 0)
+        if heading == 0:
+            queue = waiting.get(floor)
+            if queue:
+                heading = 1 if queue[0].target > floor else -1
+        elif not waiting.num_calls(floor, heading) and \
+                not self._ahead(elevator, waiting, heading):
+            # Reverse here to serve the calls going the other way.
+            if waiting.num_calls(floor, -heading):
+                heading = -heading
+        self._heading[elevator] = heading
+        if heading == 0:
+            return []
+        return waiting.board(elevator, space, heading)
+
+    def move_elevators(self,
+                       elevators: List[Elevator],
+                       waiting: Dict[int, Deque[Person]],
+                       max_floor: int) -> List[Direction]:
+        """Return a list of directions for each elevator based on the LOOK
+        algorithm.
+        """
+        waiting = _as_queues(waiting)
+        output_directions = []
+        for elevator in elevators:
+            heading = self._heading.get(elevator, 0)
+            if heading == 0 or not self._ahead(elevator, waiting, heading):
+                heading = self._set_off(elevator, waiting, heading)
+            self._heading[elevator] = heading
+            if heading == 0:
+                output_directions.append(
+                    _move_towards(elevator, elevator.floor))
+            else:
+                output_directions.append(_move_towards(
+                    elevator, self._next_stop(elevator, waiting, heading)))
+        return output_directions
+
+    def _next_stop(self, elevator: Elevator, waiting: WaitingQueues,
+                   heading: int) -> int:
+        """Return the next floor <elevator> stops at ahead of it in the
+        direction of <heading>.
+
+        This is the closest passenger target or call going the same way
+        ahead of it. If there is none, it is the farthest call ahead going
+        the other way, where the elevator turns around.
+
+        Precondition: self._ahead(elevator, waiting, heading)
+        """
+        floor = elevator.floor
+        stops = []
+        for floors in (elevator.target_floors(),
+                       self._calls_for(elevator, waiting, heading)):
+            if heading > 0:
+                i = bisect_right(floors, floor)
+                stops.extend(floors[i:i + 1])
+            else:
+                i = bisect_left(floors, floor)
+                stops.extend(floors[max(i - 1, 0):i])
+        if stops:
+            return min(stops, key=lambda stop: abs(stop - floor))
+        calls = self._calls_for(elevator, waiting, -heading)
+        return calls[-1] if heading > 0 else calls[0]
+
+    def _set_off(self, elevator: Elevator, waiting: WaitingQueues,
+                 heading: int) -> int:
+        """Return the new heading of <elevator>, which has no requests ahead
+        of it in the direction of <heading> (or has no heading).
+        """
+        if heading != 0:
+            return -heading if self._ahead(elevator, waiting, -heading) else 0
+        floor = elevator.floor
+        requests = [elevator.nearest_target()]
+        for direction in (1, -1):
+            calls = self._calls_for(elevator, waiting, direction)
+            i = bisect_left(calls, floor)
+            if i > 0:
+                requests.append(calls[i - 1])
+            i = bisect_right(calls, floor)
+            if i < len(calls):
+                requests.append(calls[i])
+        requests = [f for f in requests if f is not None and f != floor]
+        if not requests:
+            return 0
+        target = min(requests, key=lambda f: (abs(f - floor), f))
+        return 1 if target > floor else -1
+
+    def _ahead(self, elevator: Elevator, waiting: WaitingQueues,
+               heading: int) -> bool:
+        """Return whether <elevator> has a request ahead of it in the
+        direction of <heading>.
+        """
+        if _beyond(elevator.target_floors(), elevator.floor, heading):
+            return True
+        return any(_beyond(self._calls_for(elevator, waiting, direction),
+                           elevator.floor, heading)
+                   for direction in (1, -1))
+
+    def _calls_for(self, elevator: Elevator, waiting: WaitingQueues,
+                   direction: int) -> List[int]:
+        """Return the floors with people waiting to go up (if <direction> is
+        1) or down (if <direction> is -1) that <elevator> answers, in
+        increasing order.
+
+        An elevator with room answers every call, and a full one none.
+        """
+        if elevator.num_passengers() >= elevator.capacity:
+            return []
+        return waiting.call_floors(direction)
+
+
+@register_moving_algorithm('group')
+class GroupDispatcher(LookAlgorithm):
+    """A group control moving algorithm, which assigns each hall call to
+    one elevator.
+
+    A hall call is a floor with people waiting to go in one direction. At
+    the start of every round, calls are assigned one at a time, starting
+    from the call whose first person in line going that way has waited
+    longest. Each call
+    goes to the elevator with the smallest estimated time of arrival (ETA)
+    at the floor, among those with room left once the calls already given
+    to them are counted. If the call has more people than that elevator has
+    room for, the rest go to the next best elevator, and so on.
+
+    Elevators then move as in LookAlgorithm, except that an elevator only
+    travels for the calls assigned to it. Passing elevators still pick up
+    people going their way. An elevator with no passengers and no calls
+    heads for the nearest floor with someone waiting, as in LookAlgorithm,
+    so that idle elevators gather where the calls come from (e.g. the lobby
+    in up-peak traffic) rather than staying wherever they stopped.
+
+    === Private Attributes ===
+    _assigned: maps each elevator to the floors of the down calls and of
+               the up calls assigned to it this round, in increasing order
+    """
+    _assigned: Dict[Elevator, Tuple[List[int], List[int]]]
+
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        """Initialize a new GroupDispatcher with no calls assigned."""
+        LookAlgorithm.__init__(self, rng)
+        self._assigned = {}
+
+    def move_elevators(self,
+                       elevators: List[Elevator],
+                       waiting: Dict[int, Deque[Person]],
+                       max_floor: int) -> List[Direction]:
+        """Return a list of directions for each elevator after assigning
+        this round's hall calls.
+        """
+        waiting = _as_queues(waiting)
+        self._assign_calls(elevators, waiting)
+        return LookAlgorithm.move_elevators(self, elevators, waiting,
+                                            max_floor)
+
+    def _assign_calls(self, elevators: List[Elevator],
+                      waiting: WaitingQueues) -> None:
+        """Assign every hall call with an elevator that has room for it."""
+        self._assigned = {elevator: ([], []) for elevator in elevators}
+        load = {elevator: elevator.num_passengers()
+                for elevator in elevators}
+        calls = [(floor, direction) for direction in (1, -1)
+                 for floor in waiting.call_floors(direction)]
+        calls.sort(key=lambda call: -waiting.first_in_line(*call).wait_time)
+        for floor, direction in calls:
+            people = waiting.num_calls(floor, direction)
+            while people > 0:
+                best, best_eta = None, None
+                for elevator in elevators:
+                    if load[elevator] >= elevator.capacity or \
+                            floor in self._assigned[elevator][direction > 0]:
+                        continue
+                    eta = self._eta(elevator, floor, direction)
+                    if best_eta is None or eta < best_eta:
+                        best, best_eta = elevator, eta
+                if best is None:
+                    break
+                taken = min(people, best.capacity - load[best])
+                load[best] += taken
+                people -= taken
+                insort(self._assigned[best][direction > 0], floor)
+
+    def _eta(self, elevator: Elevator, floor: int, direction: int) -> int:
+        """Return the estimated number of rounds <elevator> needs to reach
+        the call going <direction> on <floor>.
+
+        An elevator without a heading goes straight there. A heading one
+        reaches the call on its way if the call is ahead and going the same
+        way; otherwise it first travels to its farthest request ahead and
+        turns around. Travel times follow the elevator's speed and
+        acceleration, starting once its doors close; stops on the way are
+        not counted.
+        """
+        wait = elevator.doors_open_for()
+        heading = self._heading.get(elevator, 0)
+        if heading == 0 or (direction == heading and
+                            (floor - elevator.floor) * heading >= 0):
+            return wait + elevator.travel_time(abs(floor - elevator.floor))
+        down, up = self._assigned[elevator]
+        requests = elevator.target_floors() + down + up
+        if heading > 0:
+            turn = max(requests + [elevator.floor])
+        else:
+            turn = min(requests + [elevator.floor])
+        return wait + elevator.travel_time(abs(turn - elevator.floor)) + \
+            elevator.travel_time(abs(turn - floor))
+
+    def _calls_for(self, elevator: Elevator, waiting: WaitingQueues,
+                   direction: int) -> List[int]:
+        """Return the floors of the calls going <direction> assigned to
+        <elevator>, in increasing order, or of every call going <direction>
+        if <elevator> is idle. A full elevator answers no call.
+        """
+        if elevator.num_passengers() >= elevator.capacity:
+            return []
+        assigned = self._assigned.get(elevator, ([], []))
+        if assigned[0] or assigned[1] or elevator.num_passengers():
+            return assigned[direction > 0]
+        return waiting.call_floors(direction)
+
+
+@register_moving_algorithm('destination')
+class DestinationDispatcher(GroupDispatcher):
+    """A destination dispatch moving algorithm, which assigns each waiting
+    person to an elevator according to their target floor.
+
+    As in a destination dispatch building, people give their target floor
+    when they arrive and are told which elevator to take. A person is
+    assigned once, to the elevator for which the assignment costs least:
+    its ETA at the person's floor, plus twice the time it takes to travel
+    as far as the person's target widens the range of targets it already
+    serves (its round trip grows by that much each way), plus the time of a
+    round trip of the building for every person it is committed to carry
+    beyond its capacity. People going to nearby
+    floors are therefore grouped into the same elevator.
+
+    Elevators only pick up the people assigned to them, going their way
+    unless nothing is left ahead, and move as in GroupDispatcher towards
+    their passengers' targets and the floors of the people assigned to them.
+
+    === Private Attributes ===
+    _riders: maps each elevator to the waiting people assigned to it, in the
+             order they were assigned
+    _car_of: maps each waiting person to the elevator assigned to them
+    _max_floor: the top floor of the building
+    """
+    _riders: Dict[Elevator, Dict[Person, None]]
+    _car_of: Dict[Person, Elevator]
+    _max_floor: int
+
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        """Initialize a new DestinationDispatcher with nobody assigned."""
+        GroupDispatcher.__init__(self, rng)
+        self._riders = {}
+        self._car_of = {}
+        self._max_floor = 1
+
+    def move_elevators(self,
+                       elevators: List[Elevator],
+                       waiting: Dict[int, Deque[Person]],
+                       max_floor: int) -> List[Direction]:
+        """Return a list of directions for each elevator after assigning
+        the newly arrived people.
+        """
+        self._max_floor = max_floor
+        return GroupDispatcher.move_elevators(self, elevators, waiting,
+                                              max_floor)
+
+    def board_passengers(self, elevator: Elevator, waiting: WaitingQueues,
+                         space: int) -> List[Person]:
+        """Move up to <space> of the people assigned to <elevator> who are
+        waiting on its floor onto <elevator>, and return them.
+        """
+        riders = self._riders.get(elevator)
+        if not riders:
+            return []
+        heading = self._heading.get(elevator, 0)
+        if heading != 0 and not self._ahead(elevator, waiting, heading):
+            heading = 0
+        boarded = waiting.board(elevator, space, heading,
+                                lambda person: person in riders)
+        for person in boarded:
+            del riders[person]
+            del self._car_of[person]
+        return boarded
+
+    def _assign_calls(self, elevators: List[Elevator],
+                      waiting: WaitingQueues) -> None:
+        """Assign every newly arrived person to an elevator, and record the
+        floors each elevator must visit to pick up its people.
+        """
+        reach, load = {}, {}
+        self._assigned = {}
+        for elevator in elevators:
+            riders = self._riders.setdefault(elevator, {})
+            targets = elevator.target_floors()[:1] + \
+                elevator.target_floors()[-1:] + \
+                [rider.target for rider in riders]
+            reach[elevator] = (min(targets), max(targets)) if targets \
+                else None
+            load[elevator] = elevator.num_passengers() + len(riders)
+            self._assigned[elevator] = ([], [])
+            for rider in riders:
+                self._assign_floor(elevator, rider)
+
+        # The people not yet assigned are at the back of each queue.
+        for floor in waiting.nonempty_floors():
+            queue = waiting[floor]
+            new = 0
+            while new < len(queue) and queue[-1 - new] not in self._car_of:
+                new += 1
+            for i in range(len(queue) - new, len(queue)):
+                person = queue[i]
+                best = min(elevators, key=lambda elevator: self._cost(
+                    elevator, person, reach[elevator], load[elevator]))
+                self._riders[best][person] = None
+                self._car_of[person] = best
+                load[best] += 1
+                low, high = reach[best] or (person.target, person.target)
+                reach[best] = (min(low, person.target),
+                               max(high, person.target))
+                self._assign_floor(best, person)
+
+    def _assign_floor(self, elevator: Elevator, person: Person) -> None:
+        """Record that <elevator> must pick up <person>, who is waiting."""
+        floors = self._assigned[elevator][person.target > person.start]
+        i = bisect_left(floors, person.start)
+        if i == len(floors) or floors[i] != person.start:
+            floors.insert(i, person.start)
+
+    def _cost(self, elevator: Elevator, person: Person,
+              reach: Optional[Tuple[int, int]], load: int) -> int:
+        """Return the cost of assigning <person> to <elevator>, whose current
+        and assigned passengers' targets lie in the range <reach> (None if
+        there are none), and which is committed to carry <load> people.
+        """
+        direction = 1 if person.target > person.start else -1
+        widening = 0
+        if reach is not None:
+            widening = max(reach[1], person.target) - \
+                min(reach[0], person.target) - (reach[1] - reach[0])
+        overload = max(load + 1 - elevator.capacity, 0)
+        return self._eta(elevator, person.start, direction) + \
+            2 * elevator.travel_time(widening) + \
+            2 * elevator.travel_time(self._max_floor) * overload
+
+
+def _beyond(floors: List[int], floor: int, heading: int) -> bool:
+    """Return whether any floor in <floors> is above <floor> (if <heading> is
+    1) or below it (if <heading> is -1).
+
+    Precondition: <floors> is sorted in increasing order.
+    """
+    if heading > 0:
+        return bisect_right(floors, floor) < len(floors)
+    return bisect_left(floors, floor) > 0
+
+
+def _as_queues(waiting: Dict[int, Deque[Person]]) -> WaitingQueues:
+    """Return <waiting> as a WaitingQueues, copying it only if it is a plain
+    dictionary of people waiting on each floor.
+    """
+    if isinstance(waiting, WaitingQueues):
+        return waiting
+    return WaitingQueues(waiting)
+
+
+def _move_towards(elevator: Elevator, floor: int) -> Direction:
+    """Move <elevator> towards <floor> as far as it can this round and
+    return the direction it moved in.
+
+    With the default kinematics the elevator moves one floor.
+    """
+    moved = elevator.move_towards(floor)
+    if moved < 0:
+        return Direction.DOWN
+    elif moved > 0:
+        return Direction.UP
+    return Direction.STAY
+
+
 if __name__ == '__main__':
     # Don't forget to check your work regularly with python_ta!
     import python_ta
     python_ta.check_all(config={
-        'allowed-io': ['__init__'],
-        'extra-imports': ['entities', 'random', 'csv', 'enum'],
+        'allowed-io': ['__init__', '_read_rows'],
+        'extra-imports': ['bisect', 'entities', 'random', 'csv', 'enum',
+                          'mmap', 'traces'],
         'max-nested-blocks': 4,
         'disable': ['R0201']
     })
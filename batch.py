@@ -0,0 +1,494 @@
+"""CSC148 Assignment 1 - Batch Simulation
+
+=== Module Description ===
+
+This file contains the BatchSimulation class, which runs many independent
+replicas of the same simulation configuration in lockstep. Instead of Person
+and Elevator objects, the state of every replica is kept in NumPy arrays
+(elevator floors, passenger slots and per-floor queues), and each stage of a
+round is applied to all replicas at once.
+
+A replica follows exactly the same rules as Simulation.run, so replaying the
+same arrivals gives the same statistics (up to rounding in the standard
+deviation, which is computed from exact sums instead). Only the
+RandomAlgorithm, PushyPassenger and ShortSighted moving algorithms, and
+the default elevator kinematics (one floor per round, no door dwell), are
+supported.
+"""
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+import algorithms
+from entities import PersonStore
+from stats import QuantileSketch, RunningStats, trip_stats
+import traffic
+
+
+class BatchSimulation:
+    """Many replicas of one simulation configuration, run in lockstep.
+
+    RandomArrivals, BulkRandomArrivals and RandomAlgorithm draw independent
+    random numbers for every replica. Any other arrival generator is asked
+    once per round, and its arrivals are given to every replica.
+
+    === Attributes ===
+    arrival_generator: the algorithm used to generate new arrivals
+    moving_algorithm: the algorithm used to decide how to move elevators
+    num_floors: the number of floors
+    num_elevators: the number of elevators in each replica
+    capacity: the capacity of every elevator
+    num_replicas: the number of replicas run together
+
+    === Private Attributes ===
+    _arrival_rng: the source of the random arrivals of all replicas
+    _moving_rng: the source of the random moves of all replicas
+    _floor: the floor of each elevator, shape (replicas, elevators)
+    _count: the number of passengers on each elevator
+    _car_target, _car_arrival: the target floor and arrival round of each
+        passenger slot, shape (replicas, elevators, capacity), in boarding
+        order; only the first _count slots of an elevator are used, and the
+        target of an unused slot is 0
+    _head, _size: the start and length of the ring buffer holding each
+        floor's queue, shape (replicas, floors)
+    _queue_target, _queue_arrival: the ring buffers of the floor queues,
+        shape (replicas, floors, queue capacity)
+    _total, _completed, _time_sum, _time_squares, _time_min, _time_max:
+        the per-replica trip statistics
+    _time_buckets: the number of trips of each replica in each bucket of a
+        stats.QuantileSketch, shape (replicas, buckets); column k + 1 counts
+        bucket k
+    _bucket_of: the column of _time_buckets counting each trip time
+    _clock: the number of rounds run by earlier calls to run, which the
+        arrival rounds of people are counted from
+
+    === Representation invariants ===
+    num_floors >= 2
+    num_elevators >= 1
+    capacity >= 1
+    num_replicas >= 1
+    0 <= _count <= capacity
+    0 <= _size <= queue capacity
+    """
+    arrival_generator: algorithms.ArrivalGenerator
+    moving_algorithm: algorithms.MovingAlgorithm
+    num_floors: int
+    num_elevators: int
+    capacity: int
+    num_replicas: int
+
+    def __init__(self, config: Dict[str, Any], num_replicas: int,
+                 seed: Any = None) -> None:
+        """Initialize <num_replicas> replicas of the simulation described by
+        <config>, which has the same keys as for Simulation.
+
+        <seed> seeds the random numbers drawn for the replicas; if it is None,
+        the 'seed' of <config> (if any) is used instead. As in Simulation,
+        arrivals and moves are drawn from separate streams of the seed, so
+        replicas with the same seed see the same arrivals whatever the
+        moving algorithm.
+        """
+        self.arrival_generator = config['arrival_generator']
+        self.moving_algorithm = config['moving_algorithm']
+        if not isinstance(self.moving_algorithm,
+                          (algorithms.RandomAlgorithm,
+                           algorithms.PushyPassenger,
+                           algorithms.ShortSighted)):
+            raise ValueError(f'BatchSimulation does not support '
+                             f'{type(self.moving_algorithm).__name__}')
+        if config.get('max_speed', 1) != 1 or \
+                config.get('acceleration') not in (None, 1) or \
+                config.get('door_dwell', 0) != 0:
+            raise ValueError('BatchSimulation only supports elevators that '
+                             'move one floor per round')
+        if config.get('telemetry') is not None or config.get('profile'):
+            raise ValueError('BatchSimulation does not record telemetry or '
+                             'profiles')
+        self.num_floors = config['num_floors']
+        self.num_elevators = config['num_elevators']
+        self.capacity = config['elevator_capacity']
+        self.num_replicas = num_replicas
+        if seed is None:
+            seed = config.get('seed')
+        self._arrival_rng = _numpy_rng(seed, 'arrivals')
+        self._moving_rng = _numpy_rng(seed, 'moving')
+
+        shape = (num_replicas, self.num_elevators)
+        self._floor = np.ones(shape, dtype=np.int32)
+        self._count = np.zeros(shape, dtype=np.int32)
+        self._car_target = np.zeros(shape + (self.capacity,), dtype=np.int32)
+        self._car_arrival = np.zeros_like(self._car_target)
+
+        shape = (num_replicas, self.num_floors)
+        self._head = np.zeros(shape, dtype=np.int32)
+        self._size = np.zeros(shape, dtype=np.int32)
+        self._queue_target = np.zeros(shape + (16,), dtype=np.int32)
+        self._queue_arrival = np.zeros_like(self._queue_target)
+
+        self._total = np.zeros(num_replicas, dtype=np.int64)
+        self._completed = np.zeros(num_replicas, dtype=np.int64)
+        self._time_sum = np.zeros(num_replicas, dtype=np.int64)
+        self._time_squares = np.zeros(num_replicas, dtype=np.int64)
+        self._time_min = np.full(num_replicas, np.iinfo(np.int64).max)
+        self._time_max = np.zeros(num_replicas, dtype=np.int64)
+        self._time_buckets = np.zeros((num_replicas, 1), dtype=np.int64)
+        self._bucket_of = np.zeros(1, dtype=np.int64)
+        self._clock = 0
+
+    def run(self, num_rounds: int) -> List[Dict[str, Any]]:
+        """Run every replica for the given number of rounds.
+
+        Return the statistics of each replica, in the same format as
+        Simulation.run.
+
+        Precondition: num_rounds >= 1.
+
+        As with Simulation.run, a later run carries on from where the last
+        one stopped, and the statistics include the trips of earlier runs.
+        """
+        # No trip takes longer than all the runs so far, so the sketch
+        # buckets of every possible trip time can be looked up in a table.
+        sketch = QuantileSketch()
+        end = self._clock + num_rounds
+        self._bucket_of = np.array(
+            [sketch.key(time) + 1 for time in range(end + 1)])
+        columns = self._bucket_of[-1] + 1
+        if columns > self._time_buckets.shape[1]:
+            grown = np.zeros((self.num_replicas, columns), dtype=np.int64)
+            grown[:, :self._time_buckets.shape[1]] = self._time_buckets
+            self._time_buckets = grown
+        for i in range(num_rounds):
+            self._generate_arrivals(i)
+            self._handle_leaving(i)
+            self._handle_boarding()
+            self._move_elevators()
+        self._clock = end
+        return self._calculate_stats(num_rounds)
+
+    ###########################################################################
+    # Stages of a round
+    ###########################################################################
+    def _generate_arrivals(self, round_num: int) -> None:
+        """Add the arrivals of this round to the back of the floor queues."""
+        replica, start, target = self._arrivals(round_num + 1)
+        if len(replica) == 0:
+            return
+        key = replica * self.num_floors + (start - 1)
+        counts = np.bincount(key, minlength=self._size.size)
+        counts = counts.reshape(self._size.shape)
+        self._total += counts.sum(axis=1)
+        self._reserve_queue((self._size + counts).max())
+
+        # People arriving on the same floor in the same round keep their
+        # order: rank each one among the earlier arrivals for its floor.
+        if counts.max() > 1:
+            order = np.argsort(key, kind='stable')
+            key = key[order]
+            target = target[order]
+            rank = np.arange(len(key)) - np.searchsorted(key, key)
+        else:
+            rank = 0
+        queue_capacity = self._queue_target.shape[2]
+        pos = ((self._head.ravel()[key] + self._size.ravel()[key] + rank)
+               % queue_capacity)
+        self._queue_target.reshape(-1, queue_capacity)[key, pos] = target
+        self._queue_arrival.reshape(-1, queue_capacity)[key, pos] = \
+            self._clock + round_num
+        self._size += counts
+
+    def _handle_leaving(self, round_num: int) -> None:
+        """Remove the passengers leaving at each elevator's floor and record
+        their trips.
+        """
+        # Work on one row of passenger slots per elevator.
+        car_target = self._car_target.reshape(-1, self.capacity)
+        car_arrival = self._car_arrival.reshape(-1, self.capacity)
+        floor = self._floor.ravel()
+        if isinstance(self.moving_algorithm, algorithms.PushyPassenger):
+            # Only the leading run of passengers (in boarding order) leaves,
+            # so only elevators whose first passenger leaves are affected.
+            rows = np.flatnonzero(car_target[:, 0] == floor)
+            leaving = car_target[rows] == floor[rows][:, None]
+            leaving = np.cumprod(leaving, axis=1, dtype=bool)
+            row, slot = np.nonzero(leaving)
+        else:
+            matches = np.flatnonzero(car_target == floor[:, None])
+            row, slot = np.divmod(matches, self.capacity)
+            first = np.diff(row, prepend=-1) != 0
+            rows = row[first]
+            row = np.cumsum(first) - 1
+            leaving = np.zeros((len(rows), self.capacity), dtype=bool)
+            leaving[row, slot] = True
+        if len(rows) == 0:
+            return
+
+        # Rows are in replica order, and so are the trips taken from them, so
+        # each replica's trips are combined with reduceat.
+        times = self._clock + round_num - car_arrival[rows[row], slot]
+        trip_replica = rows[row] // self.num_elevators
+        starts = np.flatnonzero(np.diff(trip_replica, prepend=-1))
+        replicas = trip_replica[starts]
+        self._completed[replicas] += np.diff(starts, append=len(times))
+        self._time_sum[replicas] += np.add.reduceat(times, starts)
+        self._time_squares[replicas] += np.add.reduceat(
+            times.astype(np.int64) ** 2, starts)
+        self._time_min[replicas] = np.minimum(
+            self._time_min[replicas], np.minimum.reduceat(times, starts))
+        self._time_max[replicas] = np.maximum(
+            self._time_max[replicas], np.maximum.reduceat(times, starts))
+        np.add.at(self._time_buckets, (trip_replica, self._bucket_of[times]),
+                  1)
+
+        # Move the remaining passengers of these elevators to the front of
+        # their slots, keeping their order, and clear the freed slots.
+        targets = car_target[rows]
+        staying = ((targets > 0) & ~leaving).ravel()
+        kept = np.flatnonzero(staying)
+        row, slot = np.divmod(kept, self.capacity)
+        before_row = np.cumsum(staying) - staying
+        new_slot = before_row[kept] - before_row[row * self.capacity]
+        compacted = np.zeros_like(targets)
+        compacted[row, new_slot] = targets[row, slot]
+        car_target[rows] = compacted
+        compacted[row, new_slot] = car_arrival[rows][row, slot]
+        car_arrival[rows] = compacted
+        self._count.ravel()[rows] = np.bincount(row, minlength=len(rows))
+
+    def _handle_boarding(self) -> None:
+        """Board people onto elevators, in elevator order, up to capacity."""
+        # Elevators on the same floor of the same replica share its queue:
+        # each one takes people after those taken by the elevators before it.
+        key = (np.arange(self.num_replicas)[:, None] * self.num_floors +
+               self._floor - 1).ravel()
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        space = (self.capacity - self._count).ravel()[order]
+        before = np.cumsum(space) - space
+        before -= before[np.searchsorted(key, key, side='left')]
+        n = np.clip(self._size.ravel()[key] - before, 0, space)
+        boarding = np.nonzero(n)[0]
+        if len(boarding) == 0:
+            return
+
+        # One entry per person boarding: which elevator, and their position
+        # in the floor queue and in the elevator.
+        queue_capacity = self._queue_target.shape[2]
+        n = n[boarding]
+        first = np.cumsum(n) - n
+        person = np.arange(first[-1] + n[-1]) - np.repeat(first, n)
+        floor_key = np.repeat(key[boarding], n)
+        car = np.repeat(order[boarding], n)
+        pos = ((self._head.ravel()[floor_key] +
+                np.repeat(before[boarding], n) + person) % queue_capacity)
+        slot = self._count.ravel()[car] + person
+
+        queue_target = self._queue_target.reshape(-1, queue_capacity)
+        queue_arrival = self._queue_arrival.reshape(-1, queue_capacity)
+        car_target = self._car_target.reshape(-1, self.capacity)
+        car_arrival = self._car_arrival.reshape(-1, self.capacity)
+        car_target[car, slot] = queue_target[floor_key, pos]
+        car_arrival[car, slot] = queue_arrival[floor_key, pos]
+
+        taken = np.bincount(key[boarding], weights=n,
+                            minlength=self._size.size).astype(np.int32)
+        taken = taken.reshape(self._size.shape)
+        self._head = (self._head + taken) % queue_capacity
+        self._size -= taken
+        self._count.ravel()[order[boarding]] += n
+
+    def _move_elevators(self) -> None:
+        """Move every elevator one floor according to the moving algorithm.
+        """
+        if isinstance(self.moving_algorithm, algorithms.RandomAlgorithm):
+            self._floor += self._random_directions()
+        else:
+            self._floor += np.sign(self._destinations() - self._floor)
+
+    ###########################################################################
+    # Helpers
+    ###########################################################################
+    def _arrivals(self, round_num: int
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the replica, start floor and target floor of every person
+        arriving at <round_num>, with each replica's people in arrival order.
+        """
+        generator = self.arrival_generator
+        if isinstance(generator, (algorithms.RandomArrivals,
+                                  traffic.BulkRandomArrivals)):
+            if not generator.num_people:
+                empty = np.zeros(0, dtype=np.int64)
+                return empty, empty, empty
+            if getattr(generator, 'distinct_starts', True):
+                start = self._sample_floors(generator.num_people,
+                                            generator.max_floor)
+            else:
+                start = self._arrival_rng.integers(
+                    1, generator.max_floor + 1,
+                    size=(self.num_replicas, generator.num_people))
+            # Draw from the other floors without rejection.
+            target = self._arrival_rng.integers(1, generator.max_floor,
+                                                size=start.shape)
+            target += target >= start
+            replica = np.repeat(np.arange(self.num_replicas),
+                                generator.num_people)
+            return replica, start.ravel(), target.ravel()
+
+        # Any other generator produces the same arrivals for every replica.
+        if isinstance(generator, (algorithms.MappedFileArrivals,
+                                  traffic.PoissonArrivals)):
+            start, target = generator.arrivals(round_num)
+            start = np.asarray(start, dtype=np.int64)
+            target = np.asarray(target, dtype=np.int64)
+            replica = np.repeat(np.arange(self.num_replicas), len(start))
+            return (replica, np.tile(start, self.num_replicas),
+                    np.tile(target, self.num_replicas))
+        # The people are only read here, so they go in a throwaway store.
+        generator.store = PersonStore()
+        new_arrivals = generator.generate(round_num)
+        people = [person for floor_people in new_arrivals.values()
+                  for person in floor_people]
+        start = np.array([person.start for person in people], dtype=np.int64)
+        target = np.array([person.target for person in people],
+                          dtype=np.int64)
+        replica = np.repeat(np.arange(self.num_replicas), len(people))
+        return (replica, np.tile(start, self.num_replicas),
+                np.tile(target, self.num_replicas))
+
+    def _sample_floors(self, k: int, max_floor: int) -> np.ndarray:
+        """Return <k> distinct random floors between 1 and <max_floor> for
+        every replica, as an array of shape (replicas, k).
+
+        Precondition: 1 <= k <= max_floor
+        """
+        if k > 8:
+            shape = (self.num_replicas, max_floor)
+            keys = self._arrival_rng.random(shape)
+            return np.argsort(keys, axis=1)[:, :k] + 1
+
+        # Floyd's algorithm: a few vector operations per floor drawn.
+        chosen = np.empty((self.num_replicas, k), dtype=np.int32)
+        for i, j in enumerate(range(max_floor - k, max_floor)):
+            draw = self._arrival_rng.integers(0, j + 1,
+                                              size=self.num_replicas)
+            taken = np.zeros(self.num_replicas, dtype=bool)
+            for c in range(i):
+                taken |= chosen[:, c] == draw
+            chosen[:, i] = np.where(taken, j, draw)
+        return chosen + 1
+
+    def _reserve_queue(self, needed: int) -> None:
+        """Grow the floor queue ring buffers to hold at least <needed>
+        people per floor.
+        """
+        capacity = self._queue_target.shape[2]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = (self._head[:, :, None] +
+               np.arange(self._queue_target.shape[2])) \
+            % self._queue_target.shape[2]
+        for name in ('_queue_target', '_queue_arrival'):
+            grown = np.zeros(self._head.shape + (capacity,), dtype=np.int32)
+            grown[:, :, :old.shape[2]] = np.take_along_axis(
+                getattr(self, name), old, axis=2)
+            setattr(self, name, grown)
+        self._head[:] = 0
+
+    def _random_directions(self) -> np.ndarray:
+        """Return a uniformly random valid direction for every elevator."""
+        u = self._moving_rng.random(self._floor.shape)
+        directions = np.floor(u * 3).astype(np.int64) - 1
+        at_edge = np.where(u < 0.5, 0, 1)
+        directions = np.where(self._floor == 1, at_edge, directions)
+        return np.where(self._floor == self.num_floors, -at_edge, directions)
+
+    def _destinations(self) -> np.ndarray:
+        """Return the floor that PushyPassenger or ShortSighted sends each
+        elevator towards (its own floor if it should stay).
+        """
+        floors = np.arange(1, self.num_floors + 1)
+        has_waiting = self._size > 0
+        anyone_waiting = has_waiting.any(axis=1)[:, None]
+        empty = self._count == 0
+        big = np.iinfo(np.int32).max
+        replicas = np.arange(self.num_replicas)[:, None]
+
+        if isinstance(self.moving_algorithm, algorithms.PushyPassenger):
+            lowest = np.argmax(has_waiting, axis=1)[:, None] + 1
+            idle = np.where(anyone_waiting, lowest, self._floor)
+            return np.where(empty, idle, self._car_target[:, :, 0])
+
+        # For every floor, the nearest waiting floor at or below it and at or
+        # above it; the one below wins a tie.
+        below = np.maximum.accumulate(np.where(has_waiting, floors, 0),
+                                      axis=1)
+        above = np.minimum.accumulate(
+            np.where(has_waiting, floors, big)[:, ::-1], axis=1)[:, ::-1]
+        use_below = (below > 0) & (floors - below <= above - floors)
+        nearest = np.where(use_below, below, above)
+        idle = np.where(anyone_waiting, nearest[replicas, self._floor - 1],
+                        self._floor)
+
+        # Nearest passenger target, again preferring the lower floor: the
+        # smallest key is the nearest target, and the key encodes the target.
+        key = (np.abs(self._car_target - self._floor[:, :, None]) *
+               (self.num_floors + 1) + self._car_target)
+        key = np.where(self._car_target > 0, key, big).min(axis=2)
+        return np.where(empty, idle, key % (self.num_floors + 1))
+
+    ###########################################################################
+    # Statistics calculations
+    ###########################################################################
+    def replica_stats(self) -> List[RunningStats]:
+        """Return the statistics of the trip times of every replica, which
+        may be merged to combine replicas.
+        """
+        stats = []
+        for r in range(self.num_replicas):
+            completed = int(self._completed[r])
+            if completed == 0:
+                stats.append(RunningStats())
+                continue
+            sketch = QuantileSketch()
+            for column in np.flatnonzero(self._time_buckets[r]):
+                sketch.add_key(int(column) - 1,
+                               int(self._time_buckets[r, column]))
+            stats.append(RunningStats.from_sums(
+                completed, int(self._time_sum[r]),
+                int(self._time_squares[r]), int(self._time_min[r]),
+                int(self._time_max[r]), sketch))
+        return stats
+
+    def _calculate_stats(self, iterations: int) -> List[Dict[str, Any]]:
+        """Report the statistics of every replica, in the same format as
+        Simulation.run.
+        """
+        return [{
+            'num_iterations': iterations,
+            'total_people': int(self._total[r]),
+            'people_completed': times.count,
+            **trip_stats(times)
+        } for r, times in enumerate(self.replica_stats())]
+
+
+def _numpy_rng(seed: Any, stream: str) -> np.random.Generator:
+    """Return a new NumPy generator for the stream named <stream> of the
+    master seed <seed>, or an unseeded one if <seed> is None.
+
+    Like algorithms.seeded_rng, the same seed and stream name always give
+    the same random numbers, and different streams are independent.
+    """
+    if seed is None:
+        return np.random.default_rng()
+    return np.random.default_rng(
+        algorithms.seeded_rng(seed, stream).getrandbits(64))
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['algorithms', 'entities', 'numpy', 'stats',
+                          'traffic'],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,345 @@
+"""CSC148 Assignment 1 - Benchmarks
+
+=== Module Description ===
+
+This file benchmarks headless runs of Simulation along four scaling axes:
+the number of floors, of elevators, the elevator capacity and the number of
+people arriving per round. Starting from BASE, each axis is scaled through
+the values in AXES on its own, for every moving algorithm in ALGORITHMS and
+for both random arrivals and the replay of an arrival file (FileArrivals).
+
+Each case records its rounds per second, people generated per second and
+peak memory. The time is the best of as many identical runs as fit in a
+small time budget (at least one), and the peak memory (of Python
+allocations, as traced by tracemalloc) is measured in one more run, since
+tracing slows a run down.
+
+RandomArrivals starts every person of a round on a different floor, so
+random cases with more people per round than floors use
+traffic.BulkRandomArrivals with independent start floors instead. Replayed
+files are written with independent start floors too.
+
+Results are compared against a baseline JSON file, and a case whose rounds
+per second drop, or whose peak memory grows, by more than the tolerance is
+reported as a regression. So that a baseline recorded on one machine can be
+compared against on another, both record the time of a fixed calibration
+workload that does not use the simulation, and the baseline's rounds per
+second are scaled by how much faster or slower this machine runs it. The
+scaling is only approximate, so machines unlike the baseline's (which the
+baseline names), or that throttle long bursts of work, may need a larger
+tolerance. Run this file from the command line, e.g.
+    python benchmark.py                    # compare against the baseline
+    python benchmark.py --save-baseline    # record a new baseline
+    python benchmark.py --only short_sighted/file --rounds 20
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from simulation import Simulation
+import sweep
+import traffic
+
+# The configuration every axis is scaled from.
+BASE = {
+    'num_floors': 50,
+    'num_elevators': 10,
+    'elevator_capacity': 10,
+    'num_people_per_round': 20
+}
+
+# The values each axis is scaled through.
+AXES = {
+    'num_floors': [10, 50, 100, 500],
+    'num_elevators': [1, 10, 100],
+    'elevator_capacity': [1, 10, 100, 500],
+    'num_people_per_round': [1, 100, 1000, 10000]
+}
+
+ALGORITHMS = ['random', 'pushy', 'short_sighted']
+ARRIVALS = ['random', 'file']
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'benchmark_baseline.json')
+
+
+def benchmark_cases() -> List[Dict[str, Any]]:
+    """Return every benchmark case, without repeating the case of BASE.
+
+    A case is a sweep spec (see sweep.py) that also has a 'name'.
+    """
+    cases = {}
+    for axis, values in AXES.items():
+        for value in values:
+            for algorithm in ALGORITHMS:
+                for arrivals in ARRIVALS:
+                    case = {**BASE, axis: value,
+                            'moving_algorithm': algorithm,
+                            'arrival_generator': arrivals}
+                    case['name'] = (
+                        f'{algorithm}/{arrivals}/'
+                        f'floors={case["num_floors"]},'
+                        f'elevators={case["num_elevators"]},'
+                        f'capacity={case["elevator_capacity"]},'
+                        f'people={case["num_people_per_round"]}')
+                    cases.setdefault(case['name'], case)
+    return list(cases.values())
+
+
+def write_arrivals(filename: str, num_floors: int, num_people: int,
+                   num_rounds: int, seed: Any) -> None:
+    """Write an arrival file for FileArrivals with <num_people> random
+    people arriving in every one of <num_rounds> rounds.
+    """
+    rng = random.Random(f'{seed}/benchmark')
+    with open(filename, 'w') as out:
+        for round_num in range(1, num_rounds + 1):
+            line = [round_num]
+            for _ in range(num_people):
+                start = rng.randint(1, num_floors)
+                target = rng.randint(1, num_floors - 1)
+                line.extend([start, target + (target >= start)])
+            out.write(','.join(map(str, line)) + '\n')
+
+
+def make_config(case: Dict[str, Any], directory: str,
+                num_rounds: int) -> Dict[str, Any]:
+    """Return the Simulation configuration of <case>, writing its arrival
+    file (if it replays one) to <directory>.
+    """
+    spec = {**sweep.DEFAULTS, **case, 'num_rounds': num_rounds}
+    if spec['arrival_generator'] == 'file':
+        spec['arrival_file'] = os.path.join(
+            directory, f'{spec["num_floors"]}-'
+                       f'{spec["num_people_per_round"]}-{num_rounds}.csv')
+        if not os.path.exists(spec['arrival_file']):
+            write_arrivals(spec['arrival_file'], spec['num_floors'],
+                           spec['num_people_per_round'], num_rounds,
+                           spec['seed'])
+    config = sweep.make_config(spec)
+    if spec['arrival_generator'] == 'random' and \
+            spec['num_people_per_round'] > spec['num_floors']:
+        config['arrival_generator'] = traffic.BulkRandomArrivals(
+            spec['num_floors'], spec['num_people_per_round'],
+            distinct_starts=False)
+    return config
+
+
+def run_case(case: Dict[str, Any], directory: str, num_rounds: int,
+             budget: float = 0.5, memory: bool = True) -> Dict[str, Any]:
+    """Run <case> for <num_rounds> rounds and return its measurements.
+
+    The case is run again and again until the runs have taken <budget>
+    seconds (or 100 runs), and the fastest run is kept. As with
+    timeit, garbage collection is turned off while a run is timed. The peak
+    memory is only measured (and reported) if <memory> is True.
+
+    """
+    elapsed, total = float('inf'), 0.0
+    for _ in range(100):
+        simulation = Simulation(make_config(case, directory, num_rounds))
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            stats = simulation.run(num_rounds)
+            seconds = time.perf_counter() - start
+        finally:
+            gc.enable()
+        elapsed = min(elapsed, seconds)
+        total += seconds
+        if total >= budget:
+            break
+    result = {
+        'seconds': elapsed,
+        'rounds_per_sec': num_rounds / elapsed,
+        'people_per_sec': stats['total_people'] / elapsed
+    }
+    if memory:
+        simulation = Simulation(make_config(case, directory, num_rounds))
+        tracemalloc.start()
+        try:
+            simulation.run(num_rounds)
+            result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def calibrate(budget: float = 0.5) -> float:
+    """Return the time, in seconds, of a fixed pure-Python workload on this
+    machine: the fastest of as many runs as fit in <budget> seconds (at
+    least one, and at most 100), with garbage collection turned off.
+
+    The workload does not use the simulation, so changes to the simulation
+    do not change its time.
+    """
+    elapsed, total = float('inf'), 0.0
+    for _ in range(100):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            _calibration_workload()
+            seconds = time.perf_counter() - start
+        finally:
+            gc.enable()
+        elapsed = min(elapsed, seconds)
+        total += seconds
+        if total >= budget:
+            break
+    return elapsed
+
+
+def _calibration_workload() -> int:
+    """Do a fixed amount of integer arithmetic, list, dict and attribute
+    work, like that of a simulation round, and return a checksum of it.
+    """
+    rng = random.Random(148)
+    queues = {}
+    for _ in range(20000):
+        floor = rng.randint(1, 50)
+        queues.setdefault(floor, []).append(rng.randint(1, 50))
+    checksum = 0
+    for floor in sorted(queues):
+        queue = queues[floor]
+        queue.sort()
+        checksum += sum(abs(target - floor) for target in queue)
+    return checksum
+
+
+def compare(results: Dict[str, Dict[str, Any]],
+            baseline: Dict[str, Dict[str, Any]],
+            tolerance: float, scale: Optional[float] = 1.0) -> List[str]:
+    """Return a description of every case of <results> that regressed by
+    more than <tolerance> (a fraction) from <baseline>.
+
+    The baseline's rounds per second are multiplied by <scale>, the speed
+    of this machine relative to the baseline's. If <scale> is None, only
+    the peak memory is compared.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        speed = 1.0 if scale is None else \
+            result['rounds_per_sec'] / (before['rounds_per_sec'] * scale)
+        if speed < 1 - tolerance:
+            regressions.append(f'{name}: {speed:.0%} of the baseline rounds '
+                               f'per second')
+        if 'peak_memory' in result and 'peak_memory' in before:
+            growth = result['peak_memory'] / max(before['peak_memory'], 1)
+            if growth > 1 + tolerance:
+                regressions.append(f'{name}: {growth:.0%} of the baseline '
+                                   f'peak memory')
+    return regressions
+
+
+def _machine() -> str:
+    """Return a description of this machine and Python."""
+    return (f'{platform.machine()} {platform.system()}, '
+            f'{platform.python_implementation()} '
+            f'{platform.python_version()}, {os.cpu_count()} CPUs')
+
+
+def _format(result: Dict[str, Any],
+            before: Optional[Dict[str, Any]], scale: Optional[float]) -> str:
+    """Return one line of the results table for <result>, compared with
+    <before>, scaled by <scale> (see compare), if there is a baseline for it
+    and its speed is compared.
+    """
+    line = (f'{result["rounds_per_sec"]:12.1f} '
+            f'{result["people_per_sec"]:14.1f} '
+            f'{result.get("peak_memory", 0) / 2 ** 20:10.2f}')
+    if before is not None and scale is not None:
+        speed = result['rounds_per_sec'] / (before['rounds_per_sec'] * scale)
+        line += f' {speed:8.0%}'
+    return line
+
+
+def main() -> None:
+    """Run the benchmarks given on the command line."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark headless simulations along scaling axes.')
+    parser.add_argument('--rounds', type=int, default=50,
+                        help='number of rounds each case is run for')
+    parser.add_argument('--only', default='',
+                        help='only run the cases whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='baseline JSON file to compare against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results to the baseline file '
+                             'instead of comparing against it')
+    parser.add_argument('--budget', type=float, default=0.5,
+                        help='seconds of repeated runs timed per case (the '
+                             'fastest run counts)')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='largest slowdown or memory growth (as a '
+                             'fraction) that is not a regression')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip measuring peak memory')
+    args = parser.parse_args()
+
+    calibration = calibrate(args.budget)
+    baseline, scale = {}, 1.0
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            saved = json.load(baseline_file)
+        if saved['num_rounds'] != args.rounds:
+            sys.exit(f'The baseline was run for {saved["num_rounds"]} '
+                     f'rounds, not {args.rounds}')
+        if 'calibration' in saved:
+            scale = saved['calibration'] / calibration
+        elif saved['machine'] != _machine():
+            # Without a calibration, timings from elsewhere are meaningless.
+            scale = None
+        if saved['machine'] != _machine():
+            print(f'Note: the baseline was recorded on {saved["machine"]}')
+        if scale is None:
+            print('Note: the baseline has no calibration, so only peak '
+                  'memory is compared')
+        else:
+            print(f'This machine runs the calibration at {scale:.0%} of '
+                  f'the speed of the baseline\'s')
+        baseline = saved['results']
+
+    cases = [case for case in benchmark_cases()
+             if args.only in case['name']]
+    width = max((len(case['name']) for case in cases), default=4)
+    results = {}
+    print(f'{"case":{width}} {"rounds/sec":>12} {"people/sec":>14} '
+          f'{"peak MiB":>10} {"vs base":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        for case in cases:
+            result = run_case(case, directory, args.rounds, args.budget,
+                              not args.no_memory)
+            results[case['name']] = result
+            print(f'{case["name"]:{width}} '
+                  f'{_format(result, baseline.get(case["name"]), scale)}',
+                  flush=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({'num_rounds': args.rounds, 'machine': _machine(),
+                       'calibration': calibration, 'results': results},
+                      baseline_file, indent=1, sort_keys=True)
+        print(f'Wrote {len(results)} results to {args.baseline}')
+        return
+    regressions = compare(results, baseline, args.tolerance, scale)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
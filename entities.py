@@ -15,50 +15,280 @@ methods we have provided. However, you can (and should) add new attributes,
 and of course you'll have to implement the methods we've provided, as well
 as add your own methods to complete this assignment.
 
-Finally, note that Person and Elevator each inherit from a kind of sprite found
-in sprites.py; this is to enable their instances to be visualized properly.
-You may not change sprites.py, but are responsible for reading the documentation
-to understand these classes, as well as the abstract methods your classes must
-implement.
+Person and Elevator are plain data objects and do not depend on pygame, so
+a headless simulation never loads the graphics library. When a simulation is
+visualized, the Visualizer attaches a sprite from sprites.py to each entity.
 """
 from __future__ import annotations
-from typing import List
-from sprites import PersonSprite, ElevatorSprite
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, \
+    Tuple
 
 
-class Elevator(ElevatorSprite):
+class Elevator:
     """An elevator in the elevator simulation.
 
-    Remember to add additional documentation to this class docstring
-    as you add new attributes (and representation invariants).
+    Passengers are kept in boarding order, and are also indexed by their
+    target floor so that the people leaving at a floor can be found without
+    scanning every passenger.
+
+    An elevator moves by up to max_speed floors per round. Its speed may
+    change by at most acceleration floors per round from one round to the
+    next, so a fast elevator must start braking a few floors before it
+    stops; it can only let people on or off at a floor it could stop at.
+    Once people get on or off, the doors stay open for door_dwell more
+    rounds before it can move again. By default an elevator moves one floor
+    per round and its doors never hold it up.
 
     === Attributes ===
-    passengers: A list of the people currently on this elevator
+    passengers: The people currently on this elevator, in the order they
+                boarded. Unlike the list this used to be, it is a tuple
+                that cannot be changed in place: add a passenger with
+                append_passenger, or assign a new sequence to replace them
+                all.
     floor: The current floor this elevator is on
     capacity: The maximum number of passengers the elevator can take
+    max_speed: The most floors this elevator can move in one round
+    acceleration: The most this elevator's speed can change in one round
+    door_dwell: The number of rounds this elevator waits with its doors
+                open after people get on or off
+    speed: The number of floors this elevator moved in the last round:
+           positive when it moved up, negative when it moved down
+
+    === Private Attributes ===
+    _onboard: the people on this elevator, in boarding order (the values
+              are unused; a dict gives ordered O(1) removal)
+    _by_target: maps each target floor of a passenger to the passengers
+                going there, in boarding order
+    _targets: the keys of _by_target, in increasing order
+    _dwell: the number of rounds the doors of this elevator stay open
 
     === Representation invariants ===
     floor >= 1
     capacity >= 1
+    1 <= acceleration <= max_speed
+    door_dwell >= 0
+    abs(speed) <= max_speed
+    every person in _onboard is in exactly one deque of _by_target
+    no deque in _by_target is empty
     """
-    passengers: List[Person]
     floor: int
     capacity: int
+    max_speed: int
+    acceleration: int
+    door_dwell: int
+    speed: int
+    _onboard: Dict[Person, None]
+    _by_target: Dict[int, Deque[Person]]
+    _targets: List[int]
+    _dwell: int
 
-    def __init__(self, elevator_capacity: int) -> None:
+    def __init__(self, elevator_capacity: int, max_speed: int = 1,
+                 acceleration: Optional[int] = None,
+                 door_dwell: int = 0) -> None:
         """Initialize the Elevator class
-        """
 
-        ElevatorSprite.__init__(self)
-        self.passengers = []
+        If <acceleration> is None, the elevator can reach max_speed at once.
+        """
+        self._onboard = {}
+        self._by_target = {}
+        self._targets = []
         self.floor = 1
         self.capacity = elevator_capacity
+        self.max_speed = max_speed
+        self.acceleration = max_speed if acceleration is None \
+            else acceleration
+        self.door_dwell = door_dwell
+        self.speed = 0
+        self._dwell = 0
+
+    @property
+    def passengers(self) -> Tuple[Person, ...]:
+        """The people currently on this elevator, in the order they boarded.
+        """
+        return tuple(self._onboard)
+
+    @passengers.setter
+    def passengers(self, people: Iterable[Person]) -> None:
+        """Replace the people on this elevator with <people>, in order.
+
+        Unlike append_passenger, this does not record that they boarded.
+        """
+        self._onboard = {}
+        self._by_target = {}
+        self._targets = []
+        for person in people:
+            self._add_passenger(person)
+
+    def num_passengers(self) -> int:
+        """Return the number of people on this elevator."""
+        return len(self._onboard)
+
+    def first_passenger(self) -> Optional[Person]:
+        """Return the passenger who boarded first, or None if this elevator
+        is empty.
+        """
+        return next(iter(self._onboard), None)
 
     def append_passenger(self, passenger: Person) -> None:
         """Add a passenger to this elevator if it's not full
 
         """
-        self.passengers.append(passenger)
+        passenger.board()
+        self._add_passenger(passenger)
+
+    def _add_passenger(self, passenger: Person) -> None:
+        """Put <passenger> at the end of the boarding order and index them
+        by their target floor.
+        """
+        self._onboard[passenger] = None
+        bucket = self._by_target.get(passenger.target)
+        if bucket is None:
+            self._by_target[passenger.target] = deque([passenger])
+            insort(self._targets, passenger.target)
+        else:
+            bucket.append(passenger)
+
+    def disembark(self) -> List[Person]:
+        """Remove and return every passenger whose target is the current
+        floor, in the order they boarded.
+        """
+        leaving = self._by_target.pop(self.floor, None)
+        if leaving is None:
+            return []
+        self._remove_target(self.floor)
+        for person in leaving:
+            del self._onboard[person]
+        return list(leaving)
+
+    def disembark_front(self) -> List[Person]:
+        """Remove and return the passengers at the front of the boarding order
+        whose target is the current floor.
+
+        Passengers stop leaving at the first one (in boarding order) who is
+        going somewhere else.
+        """
+        leaving = []
+        bucket = self._by_target.get(self.floor)
+        while bucket and self.first_passenger() is bucket[0]:
+            person = bucket.popleft()
+            del self._onboard[person]
+            leaving.append(person)
+        if bucket is not None and not bucket:
+            del self._by_target[self.floor]
+            self._remove_target(self.floor)
+        return leaving
+
+    def target_floors(self) -> List[int]:
+        """Return the target floors of this elevator's passengers, in
+        increasing order.
+
+        The returned list must not be mutated.
+        """
+        return self._targets
+
+    def nearest_target(self) -> Optional[int]:
+        """Return the passenger target floor closest to the current floor, or
+        None if this elevator is empty.
+
+        Ties are broken in favour of the lower floor.
+        """
+        return _nearest(self._targets, self.floor)
+
+    def _remove_target(self, floor: int) -> None:
+        """Remove <floor> from the sorted target floors of this elevator."""
+        del self._targets[bisect_left(self._targets, floor)]
+
+    def can_stop(self) -> bool:
+        """Return whether this elevator can stop at its current floor, and so
+        let people on or off there.
+        """
+        return abs(self.speed) <= self.acceleration
+
+    def open_doors(self) -> None:
+        """Stop this elevator at its current floor with its doors open, so
+        that it cannot move for door_dwell rounds.
+
+        Precondition: self.can_stop()
+        """
+        self.speed = 0
+        self._dwell = self.door_dwell
+
+    def idle(self, rounds: int) -> None:
+        """Keep this stopped elevator where it is for <rounds> rounds, as if
+        it had been moved towards its own floor once per round.
+
+        Precondition: self.speed == 0
+        """
+        self._dwell = max(self._dwell - rounds, 0)
+
+    def move_towards(self, floor: int) -> int:
+        """Move this elevator as far towards <floor> as it can this round,
+        without passing it if it can still stop there, and return the
+        number of floors it moved (negative if it moved down).
+
+        An elevator heading away from <floor> too fast to stop brakes
+        instead, and turns back in a later round.
+        """
+        if self._dwell > 0:
+            self._dwell -= 1
+            return 0
+        distance = abs(floor - self.floor)
+        heading = 1 if floor > self.floor else -1
+        speed = abs(self.speed)
+        if self.can_stop() and (distance == 0 or heading * self.speed < 0):
+            speed = 0
+        if speed > 0 and heading * self.speed < 0:
+            # Too fast to turn back yet: brake.
+            self.speed = (speed - self.acceleration) * (-heading)
+        else:
+            self.speed = self._next_speed(speed, distance) * heading
+        self.floor += self.speed
+        return self.speed
+
+    def travel_time(self, distance: int) -> int:
+        """Return the number of rounds this elevator takes to travel
+        <distance> floors from rest and stop at the end.
+        """
+        if self.acceleration == self.max_speed:
+            return -(-distance // self.max_speed)
+        rounds, speed = 0, 0
+        while distance > 0:
+            speed = self._next_speed(speed, distance)
+            distance -= speed
+            rounds += 1
+        return rounds
+
+    def doors_open_for(self) -> int:
+        """Return the number of rounds before this elevator's doors close
+        and it can move again.
+        """
+        return self._dwell
+
+    def _next_speed(self, speed: int, distance: int) -> int:
+        """Return the fastest speed this elevator, moving at <speed> floors
+        per round towards a floor <distance> floors away, can move at this
+        round while still being able to stop there.
+        """
+        fastest = min(speed + self.acceleration, self.max_speed, distance)
+        slowest = max(speed - self.acceleration, 0)
+        for candidate in range(fastest, slowest - 1, -1):
+            if distance - candidate >= self._braking_distance(candidate):
+                return candidate
+        return slowest
+
+    def _braking_distance(self, speed: int) -> int:
+        """Return the fewest floors this elevator must travel after moving
+        at <speed> floors per round before it can stop.
+        """
+        distance = 0
+        speed -= self.acceleration
+        while speed > 0:
+            distance += speed
+            speed -= self.acceleration
+        return distance
 
     def fullness(self) -> float:
         """Return the fraction that this elevator is filled.
@@ -66,15 +296,107 @@ class Elevator(ElevatorSprite):
         The value returned should be a float between 0.0 (completely empty) and
         1.0 (completely full).
         """
-        num_passenger = float(len(self.passengers))
-        if len(self.passengers) == 0:
-            assert num_passenger/self.capacity == 0
-        return num_passenger/self.capacity
+        return len(self._onboard) / self.capacity
+
+
+class PersonStore:
+    """Struct-of-arrays storage for the people in a simulation.
+
+    Each person is a record index into parallel integer columns. Records of
+    people who have finished their trip are put on a free list and reused by
+    later arrivals, so the columns only grow with the number of people alive
+    at the same time.
+
+    Wait times are not stored directly: each record keeps the round its
+    person arrived in, and a wait time is the difference between the store's
+    clock and that round. Advancing the clock therefore ages every live
+    person at once.
 
+    === Attributes ===
+    clock: the current round of the simulation using this store
+    start: the start floor of each record
+    target: the target floor of each record
+    arrival: the round each record arrived in
+    boarded: the round each record boarded an elevator, or -1 if it has
+             not boarded yet
+
+    === Representation invariants ===
+    start, target, arrival and boarded all have the same length
+    """
+    clock: int
+    start: array
+    target: array
+    arrival: array
+    boarded: array
+    _free: List[int]
 
-class Person(PersonSprite):
+    def __init__(self) -> None:
+        """Initialize an empty PersonStore."""
+        self.clock = 0
+        self.start = array('i')
+        self.target = array('i')
+        self.arrival = array('i')
+        self.boarded = array('i')
+        self._free = []
+
+    def __len__(self) -> int:
+        """Return the number of live records in this store."""
+        return len(self.start) - len(self._free)
+
+    def allocate(self, start_floor: int, target_floor: int) -> int:
+        """Return the index of a new record for a person who arrives this
+        round and has not boarded yet.
+        """
+        if self._free:
+            index = self._free.pop()
+            self.start[index] = start_floor
+            self.target[index] = target_floor
+            self.arrival[index] = self.clock
+            self.boarded[index] = -1
+        else:
+            index = len(self.start)
+            self.start.append(start_floor)
+            self.target.append(target_floor)
+            self.arrival.append(self.clock)
+            self.boarded.append(-1)
+        return index
+
+    def allocate_many(self, start_floors: Iterable[int],
+                      target_floors: Iterable[int]) -> List[int]:
+        """Return the indices of new records for people who arrive this
+        round, one for each pair of <start_floors> and <target_floors>.
+
+        This does the same as calling allocate for each pair, but new records
+        beyond the free list are appended a column at a time.
+        """
+        start_floors = array('i', start_floors)
+        target_floors = array('i', target_floors)
+        n = len(start_floors)
+        reused = [self.allocate(start_floors[i], target_floors[i])
+                  for i in range(min(n, len(self._free)))]
+        first = len(self.start)
+        fresh = n - len(reused)
+        self.start.extend(start_floors[len(reused):])
+        self.target.extend(target_floors[len(reused):])
+        self.arrival.extend(array('i', [self.clock]) * fresh)
+        self.boarded.extend(array('i', [-1]) * fresh)
+        return reused + list(range(first, first + fresh))
+
+    def release(self, index: int) -> None:
+        """Return the record at <index> to the free list.
+
+        Precondition: the record at <index> is live.
+        """
+        self._free.append(index)
+
+
+
+class Person:
     """A person in the elevator simulation.
 
+    A Person is a thin view of one record in a PersonStore; its attributes
+    are read from and written to the store's columns.
+
     === Attributes ===
     start: the floor this person started on
     target: the floor this person wants to go to
@@ -85,20 +407,78 @@ class Person(PersonSprite):
     target >= 1
     wait_time >= 0
     """
-    start: int
-    target: int
-    wait_time: int
+    __slots__ = ('_store', '_index')
+    _store: PersonStore
+    _index: int
 
-    def __init__(self, start_floor: int, target_floor: int) -> None:
+    def __init__(self, start_floor: int, target_floor: int,
+                 store: Optional[PersonStore] = None) -> None:
         """Initialize the class for Person
+
+        The person is allocated in <store>, or in a new store of their own
+        if no store is given. A person added to a simulation should be
+        allocated in the store of its arrival generator, so that the
+        simulation's clock ages them.
+
         Precondition: <start> >=1
                       <target> >= 1
                       <start> == <target> => false
         """
-        self.wait_time = 0
-        PersonSprite.__init__(self)
-        self.start = start_floor
-        self.target = target_floor
+        if store is None:
+            store = PersonStore()
+        self._store = store
+        self._index = store.allocate(start_floor, target_floor)
+
+    @classmethod
+    def from_record(cls, store: PersonStore, index: int) -> Person:
+        """Return a person viewing the existing record at <index> of <store>.
+
+        Precondition: the record at <index> is live and not viewed by any
+                      other person.
+        """
+        person = cls.__new__(cls)
+        person._store = store
+        person._index = index
+        return person
+
+    @property
+    def start(self) -> int:
+        """The floor this person started on."""
+        return self._store.start[self._index]
+
+    @start.setter
+    def start(self, floor: int) -> None:
+        self._store.start[self._index] = floor
+
+    @property
+    def target(self) -> int:
+        """The floor this person wants to go to."""
+        return self._store.target[self._index]
+
+    @target.setter
+    def target(self, floor: int) -> None:
+        self._store.target[self._index] = floor
+
+    @property
+    def wait_time(self) -> int:
+        """The number of rounds this person has been waiting."""
+        return self._store.clock - self._store.arrival[self._index]
+
+    @wait_time.setter
+    def wait_time(self, rounds: int) -> None:
+        self._store.arrival[self._index] = self._store.clock - rounds
+
+    def board(self) -> None:
+        """Record that this person boarded an elevator this round."""
+        self._store.boarded[self._index] = self._store.clock
+
+    def release(self) -> None:
+        """Free this person's record once they have finished their trip.
+
+        This person must not be used after it is released, since its record
+        may be reused by a new person.
+        """
+        self._store.release(self._index)
 
     def get_anger_level(self) -> int:
         """Return this person's anger level.
@@ -128,13 +508,178 @@ class Person(PersonSprite):
     def wait_time_increment(self) -> None:
         """Increases self.wait_time by one
 
+        The simulation does not call this every round; it advances the clock
+        of its PersonStore instead.
         """
-        self.wait_time += 1
+        self._store.arrival[self._index] -= 1
+
+
+class WaitingQueues(Dict[int, Deque[Person]]):
+    """The people waiting for an elevator, as a FIFO queue per floor.
+
+    This is a dictionary mapping floor numbers to the queue of people waiting
+    on that floor, in the order they arrived. Floors are added the first time
+    someone arrives on them and are never removed.
+
+    The floors that currently have someone waiting are kept in a sorted
+    index, so the moving algorithms can find the lowest or nearest such floor
+    without looking at every floor. The floors with someone waiting to go up
+    (an up call) and to go down (a down call) are indexed the same way.
+    Queues must only be changed through extend and board for these indexes
+    to stay correct.
+
+    === Private Attributes ===
+    _nonempty: the floors with at least one person waiting, in increasing
+               order
+    _calls: the floors with a down call and the floors with an up call, in
+            increasing order
+    _num_calls: maps each floor to the number of people waiting there to go
+                down and to go up
+    """
+    _nonempty: List[int]
+    _calls: Tuple[List[int], List[int]]
+    _num_calls: Dict[int, List[int]]
+
+    def __init__(self, queues: Optional[Dict[int, Iterable[Person]]] = None
+                 ) -> None:
+        """Initialize these queues, copying any people in <queues>."""
+        super().__init__()
+        self._nonempty = []
+        self._calls = ([], [])
+        self._num_calls = {}
+        if queues is not None:
+            for floor in sorted(queues):
+                self.extend(floor, queues[floor])
+
+    def extend(self, floor: int, people: Iterable[Person]) -> None:
+        """Add <people> to the back of the queue on <floor>."""
+        people = list(people)
+        queue = self.get(floor)
+        if queue is None:
+            queue = deque()
+            self[floor] = queue
+            self._num_calls[floor] = [0, 0]
+        was_empty = not queue
+        queue.extend(people)
+        if was_empty and queue:
+            insort(self._nonempty, floor)
+        self._count_calls(floor, people, 1)
+
+    def board(self, elevator: Elevator, n: int, direction: int = 0,
+              accept: Optional[Callable[[Person], bool]] = None
+              ) -> List[Person]:
+        """Move up to <n> people from the queue on <elevator>'s floor onto
+        <elevator>, in the order they arrived, and return them.
+
+        If <direction> is 1 (or -1), only people going up (or down) board.
+        If <accept> is given, only people for whom it returns True board.
+        Everyone else stays in the queue in the same order.
+        """
+        floor = elevator.floor
+        queue = self.get(floor)
+        if not queue or n <= 0:
+            return []
+        if direction == 0 and accept is None:
+            n = min(n, len(queue))
+            boarded = [queue.popleft() for _ in range(n)]
+        else:
+            up = direction > 0
+            if direction != 0 and not self._num_calls[floor][up]:
+                return []
+            boarded, staying = [], deque()
+            for person in queue:
+                if len(boarded) < n and \
+                        (direction == 0 or (person.target > floor) == up) \
+                        and (accept is None or accept(person)):
+                    boarded.append(person)
+                else:
+                    staying.append(person)
+            queue.clear()
+            queue.extend(staying)
+        for person in boarded:
+            elevator.append_passenger(person)
+        if not queue:
+            del self._nonempty[bisect_left(self._nonempty, floor)]
+        self._count_calls(floor, boarded, -1)
+        return boarded
+
+    def nonempty_floors(self) -> List[int]:
+        """Return the floors with someone waiting, in increasing order.
+
+        The returned list must not be mutated.
+        """
+        return self._nonempty
+
+    def call_floors(self, direction: int) -> List[int]:
+        """Return the floors with someone waiting to go up (if <direction>
+        is 1) or down (if <direction> is -1), in increasing order.
+
+        The returned list must not be mutated.
+        """
+        return self._calls[direction > 0]
+
+    def num_calls(self, floor: int, direction: int) -> int:
+        """Return the number of people waiting on <floor> to go up (if
+        <direction> is 1) or down (if <direction> is -1).
+        """
+        counts = self._num_calls.get(floor)
+        return 0 if counts is None else counts[direction > 0]
+
+    def first_in_line(self, floor: int, direction: int) -> Optional[Person]:
+        """Return the person who has waited longest on <floor> to go up (if
+        <direction> is 1) or down (if <direction> is -1), or None if nobody
+        there is going that way.
+        """
+        if not self.num_calls(floor, direction):
+            return None
+        up = direction > 0
+        for person in self[floor]:
+            if (person.target > floor) == up:
+                return person
+        return None
+
+    def nearest_floor(self, floor: int) -> Optional[int]:
+        """Return the floor closest to <floor> that has someone waiting, or
+        None if nobody is waiting.
+
+        Ties are broken in favour of the lower floor.
+        """
+        return _nearest(self._nonempty, floor)
+
+    def _count_calls(self, floor: int, people: Iterable[Person],
+                     change: int) -> None:
+        """Add <change> to the calls on <floor> of each of <people>, updating
+        the call indexes when a floor gains its first call or loses its last.
+        """
+        counts = self._num_calls[floor]
+        before = counts[:]
+        for person in people:
+            counts[person.target > floor] += change
+        for up in (False, True):
+            if not before[up] and counts[up]:
+                insort(self._calls[up], floor)
+            elif before[up] and not counts[up]:
+                calls = self._calls[up]
+                del calls[bisect_left(calls, floor)]
+
+
+def _nearest(floors: List[int], floor: int) -> Optional[int]:
+    """Return the floor in <floors> closest to <floor>, preferring the lower
+    one on a tie, or None if <floors> is empty.
+
+    Precondition: <floors> is sorted in increasing order.
+    """
+    i = bisect_left(floors, floor)
+    if i == len(floors):
+        return floors[-1] if floors else None
+    if i == 0 or floors[i] - floor < floor - floors[i - 1]:
+        return floors[i]
+    return floors[i - 1]
 
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['sprites'],
+        'extra-imports': ['array', 'bisect', 'collections'],
         'max-nested-blocks': 4
     })
@@ -0,0 +1,157 @@
+"""CSC148 Assignment 1 - Event-Driven Simulation
+
+=== Module Description ===
+
+This file contains the EventSimulation class, a version of Simulation that
+only does work in rounds where something happens.
+
+The rounds to run are kept in a heap-based event queue. Each arrival round
+reported by the arrival generator is an ARRIVAL event, and while any elevator
+is busy (moving, carrying someone, or with people waiting for it) the next
+round is a STEP event. A round run for an event does exactly what
+Simulation.run does in that round. When all elevators are idle and nobody is
+waiting, nothing is scheduled until the next arrival, so idle stretches such
+as nights and weekends are skipped in a single jump.
+
+The statistics are the same as those of Simulation.run for the same
+configuration, provided the moving algorithm rests when idle (see
+MovingAlgorithm). Otherwise every round is a STEP event. Telemetry only
+records the rounds that are run.
+"""
+import heapq
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from simulation import Simulation
+
+# The kinds of events, in the order they are handled within a round.
+ARRIVAL = 0
+STEP = 1
+
+
+class EventSimulation(Simulation):
+    """A simulation that skips the rounds in which nothing happens.
+
+    === Private Attributes ===
+    _events: the heap of scheduled (round, kind) events
+    _scheduled: the rounds that have an event in _events
+    _next_arrival: the round of the scheduled ARRIVAL event, or None if no
+                   more arrivals are scheduled
+    _rounds_run: the number of rounds run during the last call to run
+    """
+    _events: List[Tuple[int, int]]
+    _scheduled: Set[int]
+    _next_arrival: Optional[int]
+    _rounds_run: int
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """Initialize a new event-driven simulation using the given
+        configuration, which has the same keys as for Simulation.
+        """
+        Simulation.__init__(self, config)
+        self._events = []
+        self._scheduled = set()
+        self._next_arrival = None
+        self._rounds_run = 0
+
+    def run(self, num_rounds: int) -> Dict[str, Any]:
+        """Run the simulation for the given number of rounds, skipping idle
+        rounds.
+
+        Return the same statistics as Simulation.run.
+
+        Precondition: num_rounds >= 1.
+        """
+        # The store's clock keeps counting from earlier runs.
+        start = self._people.clock
+        self._events = []
+        self._scheduled = set()
+        self._rounds_run = 0
+        if self._telemetry is not None:
+            self._start_telemetry()
+        self._schedule_arrival(0)
+        if self._is_busy():
+            self._schedule(0, STEP)
+
+        previous = -1
+        while self._events:
+            round_num, _ = heapq.heappop(self._events)
+            if round_num >= num_rounds:
+                break
+            self._scheduled.remove(round_num)
+            if round_num > previous + 1:
+                self._skip_idle_rounds(round_num - previous - 1)
+            self._people.clock = start + round_num
+            self._run_round(round_num)
+            self._rounds_run += 1
+            previous = round_num
+
+            if round_num == self._next_arrival:
+                self._schedule_arrival(round_num + 1)
+            if self._is_busy():
+                self._schedule(round_num + 1, STEP)
+
+        self._people.clock = start + num_rounds
+        if self._telemetry is not None:
+            self._telemetry.flush()
+        return self._calculate_stats(num_rounds)
+
+    def rounds_run(self) -> int:
+        """Return the number of rounds actually run during the last call to
+        run.
+        """
+        return self._rounds_run
+
+    def _schedule(self, round_num: int, kind: int) -> None:
+        """Add an event of <kind> at <round_num>, unless that round already
+        has one.
+        """
+        if round_num not in self._scheduled:
+            self._scheduled.add(round_num)
+            heapq.heappush(self._events, (round_num, kind))
+
+    def _schedule_arrival(self, round_num: int) -> None:
+        """Schedule the first round at or after <round_num> with arrivals.
+
+        Rounds are numbered from 0, while the arrival generator numbers them
+        from 1.
+        """
+        arrival = self.arrival_generator.next_arrival(round_num + 1)
+        self._next_arrival = None if arrival is None else arrival - 1
+        if self._next_arrival is not None:
+            self._schedule(self._next_arrival, ARRIVAL)
+
+    def _generate_arrivals(self, round_num: int) -> None:
+        """Generate and visualize new arrivals, if <round_num> has any.
+
+        The arrival generator is only asked for the rounds it reported as
+        having arrivals, since it may already have moved past the others.
+        """
+        if round_num == self._next_arrival:
+            Simulation._generate_arrivals(self, round_num)
+
+    def _is_busy(self) -> bool:
+        """Return whether the next round may do anything even without new
+        arrivals.
+        """
+        if not self.moving_algorithm.rests_when_idle or \
+                self.waiting.nonempty_floors():
+            return True
+        return any(elevator.num_passengers() or elevator.speed
+                   for elevator in self.elevators)
+
+    def _skip_idle_rounds(self, rounds: int) -> None:
+        """Skip <rounds> rounds in which nothing happens.
+
+        The doors of any elevator still open close during these rounds, as
+        if it had stood still in each of them.
+        """
+        for elevator in self.elevators:
+            elevator.idle(rounds)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['heapq', 'simulation'],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,85 @@
+"""CSC148 Assignment 1 - Stage Profiling
+
+=== Module Description ===
+
+This file contains the StageProfiler class, which measures where the time
+of a simulation goes: the number of calls and the total time of each stage
+of a round, and of the moving algorithm's move_elevators method.
+
+A profiler times a function by wrapping it, and a simulation only wraps its
+stages when profiling is enabled, so a simulation without a profiler runs
+exactly the same code as before.
+"""
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List
+
+
+class StageProfiler:
+    """The call counts and total times of the functions it wraps.
+
+    === Private Attributes ===
+    _calls: maps the name of each wrapped function to the number of times
+            it was called
+    _times: maps the name of each wrapped function to the total time spent
+            in it, in nanoseconds
+    _names: the names of the wrapped functions, in the order they were
+            wrapped
+
+    === Representation invariants ===
+    _calls and _times have the same keys, which are the names in _names
+    """
+    _calls: Dict[str, int]
+    _times: Dict[str, int]
+    _names: List[str]
+
+    def __init__(self) -> None:
+        """Initialize a new profiler that has wrapped no function."""
+        self._calls = {}
+        self._times = {}
+        self._names = []
+
+    def wrap(self, name: str, function: Callable[..., Any]
+             ) -> Callable[..., Any]:
+        """Return a function that calls <function> and adds the call and its
+        time to those of <name>.
+        """
+        if name not in self._calls:
+            self._names.append(name)
+            self._calls[name] = 0
+            self._times[name] = 0
+        calls, times = self._calls, self._times
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                times[name] += perf_counter_ns() - start
+                calls[name] += 1
+        return timed
+
+    def reset(self) -> None:
+        """Forget every call made so far."""
+        for name in self._names:
+            self._calls[name] = 0
+            self._times[name] = 0
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Return the number of calls, the total time and the mean time per
+        call (both in nanoseconds) of every wrapped function, in the order
+        they were wrapped.
+        """
+        report = {}
+        for name in self._names:
+            calls, total = self._calls[name], self._times[name]
+            report[name] = {'calls': calls, 'total_ns': total,
+                            'mean_ns': total / calls if calls else 0.0}
+        return report
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['time'],
+        'max-nested-blocks': 4
+    })
@@ -16,10 +16,12 @@ remove any of the existing attributes.
 """
 # You may import more things from these modules (e.g., additional types from
 # typing), but you may not import from any other modules.
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Tuple
 
 import algorithms
-from entities import Person, Elevator
+from entities import Person, PersonStore, Elevator, WaitingQueues
+from profiling import StageProfiler
+from stats import RunningStats, trip_stats
 from visualizer import Visualizer
 
 
@@ -33,40 +35,107 @@ class Simulation:
     num_floors: the number of floors
     visualizer: the Pygame visualizer used to visualize this simulation
     waiting: a dictionary of people waiting for an elevator
-             (keys are floor numbers, values are the list of waiting people)
-    tot_time_people: a dictionary that maps the total number of people
-                    generated to a list of time it takes for each passenger
-                    to complete their trip.
+             (keys are floor numbers, values are the queue of waiting people
+             in the order they arrived)
+    tot_time_people: the total number of people generated, and the
+                     running statistics (see stats.RunningStats) of the
+                     time it took each passenger to complete their trip.
+
+    === Private Attributes ===
+    _people: the store holding the people of this simulation
+    _move: the moving algorithm's move_elevators method
+    _unload: the moving algorithm's unload_passengers method
+    _board: the moving algorithm's board_passengers method
+    _stages: the methods running the four stages of a round, in order, or
+             timed versions of them when profiling
+    _telemetry: the telemetry.Telemetry recording every round, or None
+    _profiler: the profiler timing the stages of every round, or None
     """
     arrival_generator: algorithms.ArrivalGenerator
     elevators: List[Elevator]
     moving_algorithm: algorithms.MovingAlgorithm
     num_floors: int
     visualizer: Visualizer
-    waiting: Dict[int, List[Person]]
+    waiting: WaitingQueues
     tot_time_people: List[Any]
+    _people: PersonStore
+    _move: Callable[[List[Elevator], WaitingQueues, int],
+                    List[algorithms.Direction]]
+    _unload: Callable[[Elevator], List[Person]]
+    _board: Callable[[Elevator, WaitingQueues, int], List[Person]]
+    _stages: Tuple[Callable[[int], None], Callable[[], None],
+                   Callable[[], None], Callable[[], None]]
+    _telemetry: Any
+    _profiler: Optional[StageProfiler]
 
     def __init__(self,
                  config: Dict[str, Any]) -> None:
-        """Initialize a new simulation using the given configuration."""
+        """Initialize a new simulation using the given configuration.
+
+        The configuration may also give the 'max_speed', 'acceleration' and
+        'door_dwell' of every elevator (see Elevator); by default elevators
+        move one floor per round.
+
+        If the configuration has a 'seed', the arrival generator and the
+        moving algorithm are given their own random streams derived from it,
+        so that runs with the same seed are reproducible and see the same
+        arrivals whatever the moving algorithm.
+
+        If the configuration has a 'telemetry' object (see telemetry.py), it
+        records every round of every run. If its 'profile' is True, the time
+        spent in each stage of a round and in each policy of the moving
+        algorithm is measured, and reported in the statistics of every run.
+        Like the other statistics, the profile covers every run so far.
+        A visualized simulation is shown 'visualize_speed' times faster than
+        normal (see Visualizer).
+        """
 
         self.arrival_generator = config['arrival_generator']
 
         self.elevators = [None]*config['num_elevators']
         for index in range(config['num_elevators']):
-            self.elevators[index] = Elevator(config['elevator_capacity'])
+            self.elevators[index] = Elevator(config['elevator_capacity'],
+                                             config.get('max_speed', 1),
+                                             config.get('acceleration'),
+                                             config.get('door_dwell', 0))
 
         self.num_floors = config['num_floors']
         self.moving_algorithm = config['moving_algorithm']
-        self.waiting = {}
-        self.tot_time_people = [0, []]
+        if type(self.moving_algorithm).move_elevators is \
+                algorithms.MovingAlgorithm.move_elevators:
+            raise ValueError(f'{type(self.moving_algorithm).__name__} does '
+                             f'not implement move_elevators')
+        # Resolve the algorithm's policies once rather than every round.
+        self._move = self.moving_algorithm.move_elevators
+        self._unload = self.moving_algorithm.unload_passengers
+        self._board = self.moving_algorithm.board_passengers
+        if config.get('seed') is not None:
+            self.arrival_generator.rng = algorithms.seeded_rng(
+                config['seed'], 'arrivals')
+            self.moving_algorithm.rng = algorithms.seeded_rng(
+                config['seed'], 'moving')
+        self.waiting = WaitingQueues()
+        self.tot_time_people = [0, RunningStats()]
+        # The generator allocates its people in this simulation's store,
+        # where people added to the waiting queues before a run must also be
+        # allocated.
+        self._people = PersonStore()
+        self.arrival_generator.store = self._people
+        self._telemetry = config.get('telemetry')
+        self._stages = (self._generate_arrivals, self._handle_leaving,
+                        self._handle_boarding, self._move_elevators)
+        self._profiler = None
+        if config.get('profile'):
+            self._profile_stages()
 
         # Initialize the visualizer.
         # Note that this should be called *after* the other attributes
         # have been initialized.
         self.visualizer = Visualizer(self.elevators,
                                      self.num_floors,
-                                     config['visualize'])
+                                     config['visualize'],
+                                     self.waiting,
+                                     config.get('visualize_speed', 1.0))
 
     ############################################################################
     # Handle rounds of simulation.
@@ -79,141 +148,129 @@ class Simulation:
 
         Precondition: num_rounds >= 1.
 
-        Note: each run of the simulation starts from the same initial state
-        (no people, all elevators are empty and start at floor 1).
+        Note: a later run of the same simulation carries on from where the
+        last one stopped: the people still waiting or travelling keep their
+        wait times, and the statistics include the trips of earlier runs.
         """
+        if self._telemetry is not None:
+            self._start_telemetry()
         for i in range(num_rounds):
-            self.visualizer.render_header(i)
-
-            # Stage 1: generate new arrivals
-            self._generate_arrivals(i)
-
-            # Stage 2: leave elevators
-            self._handle_leaving()
-
-            # Stage 3: board elevators
-            self._handle_boarding()
-
-            # Stage 4: move the elevators using the moving algorithm
-            self._move_elevators()
-
-            # Pause for 1 second
-            self.visualizer.wait(1)
-
-            # Update the time that each person has waited
-            # For people waiting
-            for key in self.waiting:
-                people = self.waiting.get(key)
-                for person in people:
-                    person.wait_time_increment()
-
-            # For people in elevators
-            for elevator in self.elevators:
-                for person in elevator.passengers:
-                    person.wait_time_increment()
+            self._run_round(i)
 
+        if self._telemetry is not None:
+            self._telemetry.flush()
         return self._calculate_stats(num_rounds)
 
+    def _start_telemetry(self) -> None:
+        """Start recording a new run with the telemetry, counting only the
+        boardings and trips of the rounds still to come.
+        """
+        waiting = sum(len(self.waiting[floor])
+                      for floor in self.waiting.nonempty_floors())
+        self._telemetry.start(self.num_floors, len(self.elevators),
+                              self.tot_time_people[0] - waiting,
+                              self.tot_time_people[1].count)
+
+    def _profile_stages(self) -> None:
+        """Time every stage of a round, and every policy of the moving
+        algorithm, from now on.
+
+        The timed versions take the place of the stages and policies that
+        every round calls, so nothing is timed (or checked) when profiling
+        is off.
+        """
+        self._profiler = StageProfiler()
+        wrap = self._profiler.wrap
+        names = ('generate_arrivals', 'handle_leaving', 'handle_boarding',
+                 'move_elevators')
+        self._stages = tuple(wrap(name, stage)
+                             for name, stage in zip(names, self._stages))
+        algorithm = type(self.moving_algorithm).__name__
+        self._unload = wrap(f'{algorithm}.unload_passengers', self._unload)
+        self._board = wrap(f'{algorithm}.board_passengers', self._board)
+        self._move = wrap(f'{algorithm}.move_elevators', self._move)
+
+    def _run_round(self, round_num: int) -> None:
+        """Run the four stages of round <round_num> of the simulation."""
+        self.visualizer.render_header(round_num)
+        generate_arrivals, handle_leaving, handle_boarding, move_elevators = \
+            self._stages
+
+        # Stage 1: generate new arrivals
+        generate_arrivals(round_num)
+
+        # Stage 2: leave elevators
+        handle_leaving()
+
+        # Stage 3: board elevators
+        handle_boarding()
+
+        # Stage 4: move the elevators using the moving algorithm
+        move_elevators()
+
+        # Pause for 1 second
+        self.visualizer.wait(1)
+
+        if self._telemetry is not None:
+            self._telemetry.record(round_num, self.waiting, self.elevators,
+                                   self.tot_time_people[0],
+                                   self.tot_time_people[1].count)
+
+        # Every waiting or travelling person has now waited one more
+        # round; their wait times are derived from the store's clock.
+        self._people.clock += 1
+
     def _generate_arrivals(self, round_num: int) -> None:
         """Generate and visualize new arrivals."""
 
         new_arrivals = self.arrival_generator.generate(round_num+1)
-        self.waiting.update(self.same_floor_arrival(new_arrivals))
+        for floor, people in new_arrivals.items():
+            self.tot_time_people[0] += len(people)
+            self.waiting.extend(floor, people)
 
-        if self.waiting is not None:
-            Visualizer.show_arrivals(self.visualizer, self.waiting)
-
-    def same_floor_arrival(self, new_arrivals: Dict) -> Dict:
-        """ Add to the list of people that is already waiting on a
-        specific floor
-
-        """
-        same_floor = []
-        for key in new_arrivals:
-            self.tot_time_people[0] = self.tot_time_people[0] + 1
-
-            if key in self.waiting:
-                self.waiting[key].extend(new_arrivals[key])
-                same_floor.append(key)
-        for key in same_floor:
-            del new_arrivals[key]
-        return new_arrivals
+        Visualizer.show_arrivals(self.visualizer, new_arrivals)
 
     def _handle_leaving(self) -> None:
         """Handle people leaving elevators."""
         for elevator in self.elevators:
-            for person in elevator.passengers:
-                if person.target == elevator.floor and \
-                        (isinstance(self.moving_algorithm,
-                                    algorithms.RandomAlgorithm) or
-                         isinstance(self.moving_algorithm,
-                                    algorithms.ShortSighted)):
-
-                    assert person.target == elevator.floor
-                    self._passenger_leaves(elevator, person)
-
-                elif isinstance(self.moving_algorithm,
-                                algorithms.PushyPassenger):
-
-                    first = elevator.passengers[0]
-                    if first is person and \
-                            first.target == elevator.floor:
-                        self._passenger_leaves(elevator, person)
+            if not elevator.can_stop():
+                continue
+            leaving = self._unload(elevator)
+            if leaving:
+                elevator.open_doors()
+            for person in leaving:
+                self._passenger_leaves(elevator, person)
 
     def _passenger_leaves(self, elevator: Elevator, person: Person) -> None:
-        self.tot_time_people[1].append(person.wait_time)
-        index = elevator.passengers.index(person)
-        del elevator.passengers[index]
+        """Record the trip of a person who has just left <elevator>."""
+        self.tot_time_people[1].add(person.wait_time)
         Visualizer.show_disembarking(self.visualizer,
                                      person,
                                      elevator)
+        person.release()
 
     def _handle_boarding(self) -> None:
         """Handle boarding of people and visualize."""
         for elevator in self.elevators:
-            if elevator.floor in self.waiting:
-                while elevator.fullness() < 1.0 and \
-                        len(self.waiting[elevator.floor]) > 0:
-                    self._board_passenger(elevator)
-
-    def _board_passenger(self, elevator: Elevator) -> None:
-        """Helper method to self._handle_boarding.
-        Boards the passengers onto the elevator
-        """
-        people = self.waiting.get(elevator.floor)
-        for person in people:
-            if person is not None:
-                elevator.append_passenger(person)
+            if not elevator.can_stop():
+                continue
+            space = elevator.capacity - elevator.num_passengers()
+            boarding = self._board(elevator, self.waiting, space)
+            if boarding:
+                elevator.open_doors()
+            for person in boarding:
                 Visualizer.show_boarding(self.visualizer,
                                          person,
                                          elevator)
-                del people[people.index(person)]
 
     def _move_elevators(self) -> None:
         """Move the elevators in this simulation.
 
         Use this simulation's moving algorithm to move the elevators.
         """
-        if isinstance(self.moving_algorithm, algorithms.RandomAlgorithm):
-            move_sequence = algorithms.RandomAlgorithm.move_elevators\
-                (self.moving_algorithm,
-                 self.elevators,
-                 self.waiting,
-                 self.num_floors)
-
-        elif isinstance(self.moving_algorithm, algorithms.PushyPassenger):
-            move_sequence = algorithms.PushyPassenger.move_elevators\
-                (self.moving_algorithm,
-                 self.elevators,
-                 self.waiting,
-                 self.num_floors)
-
-        elif isinstance(self.moving_algorithm, algorithms.ShortSighted):
-            move_sequence = algorithms.ShortSighted.move_elevators\
-                (self.moving_algorithm,
-                 self.elevators,
-                 self.waiting,
-                 self.num_floors)
+        move_sequence = self._move(self.elevators,
+                                   self.waiting,
+                                   self.num_floors)
 
         Visualizer.show_elevator_moves(self.visualizer,
                                        self.elevators,
@@ -222,31 +279,27 @@ class Simulation:
     ############################################################################
     # Statistics calculations
     ############################################################################
-    def _calculate_stats(self, iterations: int) -> Dict[str, int]:
+    def _calculate_stats(self, iterations: int) -> Dict[str, Any]:
         """Report the statistics for the current run of this simulation.
+
+        Besides the maximum, minimum and average trip times, the standard
+        deviation and the 50th, 95th and 99th percentiles are reported (the
+        percentiles to within 1%). If nobody completed their trip, every
+        trip time statistic is -1.
+
+        When profiling, the 'profile' statistic maps each timed stage and
+        policy to its number of calls and its total and mean time in
+        nanoseconds (see StageProfiler.report).
         """
-        tot_people = self.tot_time_people[0]
-        time_lst = self.tot_time_people[1]
-        tot_completed = len(time_lst)
-        max_time = 0
-        min_time = time_lst[0]
-        tot_time = 0
-        for time in time_lst:
-            if time > max_time:
-                max_time = time
-            if time < min_time:
-                min_time = time
-            tot_time += time
-        avg_time = tot_time/tot_completed
-
-        return {
+        stats = {
             'num_iterations': iterations,
-            'total_people': tot_people,
-            'people_completed': tot_completed,
-            'max_time': max_time,
-            'min_time': min_time,
-            'avg_time': avg_time
+            'total_people': self.tot_time_people[0],
+            'people_completed': self.tot_time_people[1].count,
+            **trip_stats(self.tot_time_people[1])
         }
+        if self._profiler is not None:
+            stats['profile'] = self._profiler.report()
+        return stats
 
 
 def sample_run() -> Dict[str, int]:
@@ -290,6 +343,7 @@ if __name__ == '__main__':
 
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['entities', 'visualizer', 'algorithms', 'time'],
+        'extra-imports': ['entities', 'visualizer', 'algorithms', 'stats',
+                          'profiling', 'time'],
         'max-nested-blocks': 4
     })
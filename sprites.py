@@ -10,21 +10,28 @@ This file contains the different Sprite classes, used for the visualization
 with Pygame, the graphics library we're using for this assignment.
 There's quite a bit in this file, but you aren't responsible for most of it.
 
-DO NOT CHANGE ANY CODE IN THIS FILE. You don't need to for this assignment,
-and in fact you aren't even submitting this file!
-
-The two classes whose documentation you are required to read are ElevatorSprite
-and PersonSprite, as you'll be implementing their subclasses.
-You can completely ignore the other Sprite classes in this file.
+ElevatorSprite and PersonSprite each wrap one of the plain entities from
+entities.py. They are created by the Visualizer only when a simulation is
+visualized, so importing this module (which initializes pygame) is never
+needed for a headless run.
 """
 import random
 from typing import Any
 import pygame
+from entities import Elevator, Person
+
 
+# Random placement of sprites uses its own generator, so that drawing a
+# simulation never changes the random numbers the simulation itself sees.
+_RNG = random.Random()
 
 # Images for people
 FIGURES = [f'people/person{i}.png' for i in range(1, 6)]
 
+# The scaled image of each figure, loaded the first time it is needed and
+# shared by every person sprite, which never draws on it.
+_FIGURE_IMAGES = {}
+
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -60,15 +67,18 @@ class ElevatorSprite(pygame.sprite.Sprite):
     """Sprite representing an elevator.
 
     === Attributes ===
+    elevator: the elevator drawn by this sprite
     image: the Pygame surface on which to draw this sprite
     rect: the rectangle representing the dimensions of this sprite
     """
+    elevator: Elevator
     image: pygame.Surface
     rect: pygame.Rect
 
-    def __init__(self) -> None:
-        """Initialize a new ElevatorSprite."""
+    def __init__(self, elevator: Elevator) -> None:
+        """Initialize a new ElevatorSprite for the given elevator."""
         pygame.sprite.Sprite.__init__(self)
+        self.elevator = elevator
         self.image = pygame.Surface([ELEVATOR_WIDTH, ELEVATOR_HEIGHT])
         self.image.fill(GREEN)
         self.image.set_colorkey(WHITE)
@@ -88,43 +98,50 @@ class ElevatorSprite(pygame.sprite.Sprite):
         The value returned should be a float between 0.0 (completely empty) and
         1.0 (completely full).
         """
-        raise NotImplementedError
+        return self.elevator.fullness()
 
 
 class PersonSprite(pygame.sprite.Sprite):
     """Sprite representing a person.
 
     === Attributes ===
+    person: the person drawn by this sprite
     height: the height of the person sprite
     width: the width of the person sprite
     image: the Pygame surface on which to draw this sprite
     rect: the rectangle representing the dimensions of this sprite
-    wait_time: the number of rounds this person has waited
 
     === Representation Invariants ===
     height >= 0
     width >= 0
     """
+    person: Person
     height: int
     width: int
     image: pygame.Surface
     rect: pygame.Rect
 
-    def __init__(self) -> None:
-        """Initialize a new person sprite."""
+    def __init__(self, person: Person) -> None:
+        """Initialize a new sprite for the given person."""
         super().__init__()
+        self.person = person
         self.width, self.height = PERSON_WIDTH, PERSON_HEIGHT
         self.image = self.load_image()
         self.rect = self.image.get_rect()
         self.rect.bottom = 0
-        self.rect.centerx = random.randint(-2, 2)
+        self.rect.centerx = _RNG.randint(-2, 2)
 
     def load_image(self) -> Any:
         """Load the image for this sprite and redraws it
         Lower indices are happier :)
         """
-        image = pygame.image.load(FIGURES[self.get_anger_level()])
-        return pygame.transform.scale(image, (self.width, self.height))
+        key = (self.get_anger_level(), self.width, self.height)
+        image = _FIGURE_IMAGES.get(key)
+        if image is None:
+            image = pygame.transform.scale(pygame.image.load(FIGURES[key[0]]),
+                                           (self.width, self.height))
+            _FIGURE_IMAGES[key] = image
+        return image
 
     def get_anger_level(self) -> int:
         """Return the anger level of this sprite.
@@ -134,7 +151,7 @@ class PersonSprite(pygame.sprite.Sprite):
         Anger level must be an integer between 0 and 4, inclusive.
         (0 means not at all angry, 4 is very angry)
         """
-        raise NotImplementedError
+        return self.person.get_anger_level()
 
 
 class FloorSprite(pygame.sprite.Sprite):
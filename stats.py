@@ -0,0 +1,289 @@
+"""CSC148 Assignment 1 - Trip Statistics
+
+=== Module Description ===
+
+This file contains the classes that accumulate the trip times of a
+simulation as it runs, in memory that does not grow with the length of the
+run.
+
+RunningStats keeps the count, sum, minimum, maximum and variance of the
+values added to it (the variance using Welford's method), and a
+QuantileSketch for their percentiles. Both can be merged, so the statistics
+of runs made in separate processes can be combined into those of all the
+runs together.
+"""
+from __future__ import annotations
+import math
+from typing import Any, Dict, Optional
+
+
+class QuantileSketch:
+    """A mergeable sketch of the quantiles of non-negative values.
+
+    Values are counted in buckets whose bounds grow geometrically, so every
+    quantile is reported within the sketch's relative accuracy of a value
+    actually added, and the number of buckets only grows with the logarithm
+    of the range of the values.
+
+    Bucket k > 0 holds the values in (gamma ** (k - 1), gamma ** k], where
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy); bucket 0 holds
+    the values up to 1, and bucket -1 holds 0.
+
+    === Attributes ===
+    relative_accuracy: the largest relative error of a reported quantile
+    count: the number of values added
+
+    === Private Attributes ===
+    _gamma: the ratio of the upper bounds of consecutive buckets
+    _log_gamma: the natural logarithm of _gamma
+    _buckets: maps each bucket to the number of values in it
+
+    === Representation invariants ===
+    0 < relative_accuracy < 1
+    count == sum(_buckets.values())
+    """
+    relative_accuracy: float
+    count: int
+    _gamma: float
+    _log_gamma: float
+    _buckets: Dict[int, int]
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        """Initialize a new, empty sketch.
+
+        Raise ValueError if <relative_accuracy> is not between 0 and 1.
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy must be between 0 and 1')
+        self.relative_accuracy = relative_accuracy
+        self.count = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets = {}
+
+    def key(self, value: float) -> int:
+        """Return the bucket of <value>.
+
+        Raise ValueError if <value> is negative.
+        """
+        if value < 0:
+            raise ValueError(f'cannot sketch the negative value {value}')
+        if value == 0:
+            return -1
+        return max(math.ceil(math.log(value) / self._log_gamma), 0)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add <count> copies of <value> to this sketch.
+
+        Raise ValueError if <value> is negative.
+
+        Precondition: count >= 1
+        """
+        self.add_key(self.key(value), count)
+
+    def add_key(self, key: int, count: int = 1) -> None:
+        """Add <count> values to the bucket <key>.
+
+        Precondition: count >= 1
+        """
+        self._buckets[key] = self._buckets.get(key, 0) + count
+        self.count += count
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Add every value of <other> to this sketch.
+
+        Raise ValueError if the sketches have different relative accuracies.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('cannot merge sketches with different relative '
+                             'accuracies')
+        for key, count in other._buckets.items():
+            self.add_key(key, count)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return an estimate of the <q>-quantile of the values added, or
+        None if no value was added.
+
+        This is the nearest-rank quantile: an estimate of the smallest value
+        that at least a fraction <q> of the values added are at most.
+
+        Precondition: 0 <= q <= 1
+        """
+        if self.count == 0:
+            return None
+        rank = max(math.ceil(q * self.count), 1)
+        seen = 0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if seen >= rank:
+                return self._value(key)
+        return self._value(max(self._buckets))
+
+    def _value(self, key: int) -> float:
+        """Return the value reported for bucket <key>: the value with the
+        same relative distance to both of its bounds.
+        """
+        if key < 0:
+            return 0.0
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+
+class RunningStats:
+    """The running statistics of a stream of non-negative values.
+
+    === Attributes ===
+    count: the number of values added
+    total: the sum of the values added
+    minimum: the smallest value added, or None if there is none
+    maximum: the largest value added, or None if there is none
+    sketch: the quantile sketch of the values added
+
+    === Private Attributes ===
+    _mean: the running mean of the values added, or 0.0 if there is none
+    _m2: the sum of the squared differences of the values from their mean
+
+    === Representation invariants ===
+    count == sketch.count
+    (minimum is None) == (maximum is None) == (count == 0)
+    _m2 >= 0
+    """
+    count: int
+    total: float
+    minimum: Optional[float]
+    maximum: Optional[float]
+    sketch: QuantileSketch
+    _mean: float
+    _m2: float
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        """Initialize new, empty statistics whose quantiles are reported to
+        within <relative_accuracy>.
+        """
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.sketch = QuantileSketch(relative_accuracy)
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    @classmethod
+    def from_sums(cls, count: int, total: float, total_squares: float,
+                  minimum: float, maximum: float,
+                  sketch: QuantileSketch) -> RunningStats:
+        """Return the statistics of <count> values with the given sum, sum
+        of squares, minimum, maximum and quantile sketch.
+
+        The sums should be exact (e.g. of integers), since the variance is
+        derived from their difference.
+
+        Precondition: count == sketch.count >= 1
+        """
+        stats = cls(sketch.relative_accuracy)
+        stats.count = count
+        stats.total = total
+        stats.minimum = minimum
+        stats.maximum = maximum
+        stats.sketch = sketch
+        stats._mean = total / count
+        stats._m2 = max((count * total_squares - total * total) / count, 0.0)
+        return stats
+
+    def add(self, value: float) -> None:
+        """Add <value> to these statistics.
+
+        Raise ValueError if <value> is negative.
+        """
+        self.sketch.add(value)
+        self.count += 1
+        self.total += value
+        if self.count == 1:
+            self.minimum = self.maximum = value
+        elif value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+    def merge(self, other: RunningStats) -> None:
+        """Add every value of <other> to these statistics.
+
+        Raise ValueError if their sketches have different relative
+        accuracies.
+        """
+        self.sketch.merge(other.sketch)
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.minimum, self.maximum = other.minimum, other.maximum
+        else:
+            self.minimum = min(self.minimum, other.minimum)
+            self.maximum = max(self.maximum, other.maximum)
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * (self.count * other.count
+                                                 / count)
+        self._mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+
+    def mean(self) -> float:
+        """Return the mean of the values added, or 0.0 if there is none.
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def variance(self) -> float:
+        """Return the (population) variance of the values added, or 0.0 if
+        there is none.
+        """
+        return self._m2 / self.count if self.count else 0.0
+
+    def std(self) -> float:
+        """Return the (population) standard deviation of the values added,
+        or 0.0 if there is none.
+        """
+        return math.sqrt(self.variance())
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return an estimate of the nearest-rank <q>-quantile of the values
+        added, or None if there is none.
+
+        The estimate is never below the minimum or above the maximum.
+
+        Precondition: 0 <= q <= 1
+        """
+        estimate = self.sketch.quantile(q)
+        if estimate is None:
+            return None
+        return min(max(estimate, self.minimum), self.maximum)
+
+
+def trip_stats(times: RunningStats) -> Dict[str, Any]:
+    """Return the trip time statistics reported by a simulation, given the
+    statistics of its completed trips.
+
+    If nobody completed their trip, every statistic is -1.
+    """
+    if times.count == 0:
+        return {'max_time': -1, 'min_time': -1, 'avg_time': -1,
+                'std_time': -1, 'p50_time': -1, 'p95_time': -1,
+                'p99_time': -1}
+    return {
+        'max_time': times.maximum,
+        'min_time': times.minimum,
+        'avg_time': times.mean(),
+        'std_time': times.std(),
+        'p50_time': times.quantile(0.5),
+        'p95_time': times.quantile(0.95),
+        'p99_time': times.quantile(0.99)
+    }
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['math'],
+        'max-nested-blocks': 4
+    })
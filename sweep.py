@@ -0,0 +1,171 @@
+"""CSC148 Assignment 1 - Parameter Sweeps
+
+=== Module Description ===
+
+This file runs a grid of simulation configurations in parallel. Every
+combination of the values in a grid is one run; runs are sent in chunks to a
+pool of worker processes, and the statistics of each run are written to a
+JSON lines file as soon as its chunk finishes.
+
+Runs never visualize, so neither this module nor its workers import pygame.
+
+A grid maps each of the keys below to a single value or a list of values:
+    num_floors, num_elevators, elevator_capacity, num_people_per_round,
+    num_rounds: integers
+    arrival_generator: 'random', 'file' or 'trace'
+    arrival_file: the CSV file used by the 'file' arrival generator, or the
+                  binary trace (see traces.py) used by the 'trace' one
+    moving_algorithm: the name of any algorithm registered in
+                      algorithms.MOVING_ALGORITHMS, such as 'random',
+                      'pushy' or 'short_sighted'
+    max_speed, acceleration, door_dwell: the kinematics of every elevator
+        (see entities.Elevator); acceleration may be null for instant
+        acceleration
+    seed: the master seed of the run; runs that differ only in their moving
+          algorithm see the same arrivals
+
+Run this file with a JSON grid to sweep from the command line, e.g.
+    python sweep.py grid.json -o results.jsonl --workers 64
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import itertools
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import algorithms
+from simulation import Simulation
+
+
+# The value used for every key a grid leaves out.
+DEFAULTS = {
+    'num_floors': 6,
+    'num_elevators': 2,
+    'elevator_capacity': 3,
+    'num_people_per_round': 2,
+    'arrival_generator': 'random',
+    'arrival_file': None,
+    'moving_algorithm': 'short_sighted',
+    'max_speed': 1,
+    'acceleration': None,
+    'door_dwell': 0,
+    'num_rounds': 100,
+    'seed': 0
+}
+
+
+def expand_grid(grid: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return one run specification for every combination of the values in
+    <grid>.
+
+    Keys missing from <grid> take their value from DEFAULTS.
+    """
+    unknown = set(grid) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f'Unknown sweep keys: {sorted(unknown)}')
+    keys = list(DEFAULTS)
+    values = []
+    for key in keys:
+        value = grid.get(key, DEFAULTS[key])
+        values.append(value if isinstance(value, list) else [value])
+    return [dict(zip(keys, combination))
+            for combination in itertools.product(*values)]
+
+
+def make_config(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the Simulation configuration for the run <spec>.
+
+    The configuration never visualizes.
+    """
+    num_floors = spec['num_floors']
+    if spec['arrival_generator'] == 'file':
+        arrival_generator = algorithms.FileArrivals(num_floors,
+                                                    spec['arrival_file'])
+    elif spec['arrival_generator'] == 'trace':
+        arrival_generator = algorithms.MappedFileArrivals(
+            num_floors, spec['arrival_file'])
+    elif spec['arrival_generator'] == 'random':
+        arrival_generator = algorithms.RandomArrivals(
+            num_floors, spec['num_people_per_round'])
+    else:
+        raise ValueError(
+            f'Unknown arrival generator: {spec["arrival_generator"]}')
+    return {
+        'num_floors': num_floors,
+        'num_elevators': spec['num_elevators'],
+        'elevator_capacity': spec['elevator_capacity'],
+        'num_people_per_round': spec['num_people_per_round'],
+        'arrival_generator': arrival_generator,
+        'moving_algorithm': algorithms.make_moving_algorithm(
+            spec['moving_algorithm']),
+        'max_speed': spec['max_speed'],
+        'acceleration': spec['acceleration'],
+        'door_dwell': spec['door_dwell'],
+        'visualize': False,
+        'seed': spec['seed']
+    }
+
+
+def run_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the simulation described by <spec> and return <spec> together
+    with the statistics of the run.
+    """
+    stats = Simulation(make_config(spec)).run(spec['num_rounds'])
+    return {**spec, **stats}
+
+
+def _run_chunk(specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run every spec in <specs> in this worker process."""
+    return [run_spec(spec) for spec in specs]
+
+
+def _chunks(specs: List[Dict[str, Any]],
+            chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield <specs> in consecutive lists of at most <chunk_size> specs."""
+    for i in range(0, len(specs), chunk_size):
+        yield specs[i:i + chunk_size]
+
+
+def run_sweep(grid: Dict[str, Any], output: str,
+              workers: Optional[int] = None, chunk_size: int = 8) -> int:
+    """Run every combination in <grid> over <workers> processes (one per
+    CPU by default), appending one JSON line of results per run to the file
+    <output>.
+
+    Lines are written in the order chunks finish, not in grid order.
+    Return the number of runs.
+    """
+    specs = expand_grid(grid)
+    with open(output, 'a') as out, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_chunk, chunk)
+                   for chunk in _chunks(specs, chunk_size)]
+        for future in as_completed(futures):
+            for result in future.result():
+                out.write(json.dumps(result) + '\n')
+            out.flush()
+    return len(specs)
+
+
+def main() -> None:
+    """Run the sweep given on the command line."""
+    parser = argparse.ArgumentParser(
+        description='Run a grid of elevator simulations in parallel.')
+    parser.add_argument('grid', help='JSON file mapping sweep keys to values')
+    parser.add_argument('-o', '--output', default='sweep_results.jsonl',
+                        help='JSON lines file the results are appended to')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--chunk-size', type=int, default=8,
+                        help='number of runs sent to a worker at a time')
+    args = parser.parse_args()
+
+    with open(args.grid) as grid_file:
+        grid = json.load(grid_file)
+    num_runs = run_sweep(grid, args.output, args.workers, args.chunk_size)
+    print(f'Wrote {num_runs} runs to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
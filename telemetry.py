@@ -0,0 +1,168 @@
+"""CSC148 Assignment 1 - Per-Round Telemetry
+
+=== Module Description ===
+
+This file contains the Telemetry class, which records a time series of a
+simulation's state: one row of metrics for every round it runs.
+
+Telemetry is opt-in. Pass a Telemetry object as the 'telemetry' key of a
+simulation's configuration to record its rounds; without one, a simulation
+pays only for checking that it has none once per round.
+
+Rows are kept in a preallocated NumPy buffer of chunk_size rounds. With a
+file to write to, the buffer is flushed to it as CSV (one column per metric,
+with a header line) whenever it fills up and at the end of every run, so
+memory use does not grow with the length of a run. Without a file, the
+buffer is a ring holding the latest chunk_size rounds.
+
+Every row has the following columns, in order:
+    round: the round number
+    waiting_F: the number of people waiting on floor F, for every floor
+    floor_E, load_E: the floor of elevator E and its number of passengers,
+                     for every elevator (numbered from 1)
+    boarded: the number of people who boarded an elevator in the round
+    disembarked: the number of people who left an elevator in the round
+    completed: the number of people who completed their trip so far
+"""
+from typing import List, Optional
+
+import numpy as np
+
+from entities import Elevator, WaitingQueues
+
+
+class Telemetry:
+    """A recorder of one row of metrics per round of a simulation.
+
+    === Attributes ===
+    path: the CSV file rows are flushed to, or None to keep only the
+          latest chunk_size rows in memory
+    chunk_size: the number of rows buffered in memory
+    columns: the names of the columns of every row
+
+    === Private Attributes ===
+    _buffer: the buffered rows, shape (chunk_size, len(columns))
+    _rows: the number of rows recorded since the run started or the
+           buffer was last flushed
+    _num_floors: the number of floors of the simulation
+    _boarded: the number of people who boarded an elevator so far
+    _completed: the number of people who completed their trip so far
+
+    === Representation invariants ===
+    chunk_size >= 1
+    _rows <= chunk_size if path is not None
+    """
+    path: Optional[str]
+    chunk_size: int
+    columns: List[str]
+    _buffer: np.ndarray
+    _rows: int
+    _num_floors: int
+    _boarded: int
+    _completed: int
+
+    def __init__(self, path: Optional[str] = None,
+                 chunk_size: int = 4096) -> None:
+        """Initialize a new recorder writing to the CSV file <path>, or
+        keeping the latest <chunk_size> rows in memory if <path> is None.
+
+        Precondition: chunk_size >= 1
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.columns = []
+        self._buffer = np.zeros((0, 0), dtype=np.int64)
+        self._rows = 0
+        self._num_floors = 0
+        self._boarded = 0
+        self._completed = 0
+
+    def start(self, num_floors: int, num_elevators: int, boarded: int = 0,
+              completed: int = 0) -> None:
+        """Start recording a new run of a simulation with the given number
+        of floors and elevators.
+
+        <boarded> and <completed> are the number of people who boarded an
+        elevator and who completed their trip before this run, so that the
+        first round only counts its own boardings and trips.
+
+        Any rows recorded before are discarded, and the file (if any) is
+        overwritten with just the header line.
+        """
+        self.columns = ['round']
+        self.columns.extend(f'waiting_{floor}'
+                            for floor in range(1, num_floors + 1))
+        for index in range(1, num_elevators + 1):
+            self.columns.extend([f'floor_{index}', f'load_{index}'])
+        self.columns.extend(['boarded', 'disembarked', 'completed'])
+        self._buffer = np.zeros((self.chunk_size, len(self.columns)),
+                                dtype=np.int64)
+        self._rows = 0
+        self._num_floors = num_floors
+        self._boarded = boarded
+        self._completed = completed
+        if self.path is not None:
+            with open(self.path, 'w') as out:
+                out.write(','.join(self.columns) + '\n')
+
+    def record(self, round_num: int, waiting: WaitingQueues,
+               elevators: List[Elevator], total_people: int,
+               completed: int) -> None:
+        """Record the state of a simulation at the end of round <round_num>.
+
+        <total_people> is the number of people generated so far, and
+        <completed> the number of people who completed their trip so far.
+        """
+        if self.path is not None and self._rows == self.chunk_size:
+            self.flush()
+        row = self._buffer[self._rows % self.chunk_size]
+        self._rows += 1
+
+        row[0] = round_num
+        queues = row[1:self._num_floors + 1]
+        queues[:] = 0
+        num_waiting = 0
+        for floor in waiting.nonempty_floors():
+            queues[floor - 1] = len(waiting[floor])
+            num_waiting += queues[floor - 1]
+        column = self._num_floors + 1
+        for elevator in elevators:
+            row[column] = elevator.floor
+            row[column + 1] = elevator.num_passengers()
+            column += 2
+
+        # Everyone generated has either boarded or is still waiting, and
+        # everyone who left an elevator completed their trip.
+        boarded = total_people - num_waiting
+        row[column] = boarded - self._boarded
+        row[column + 1] = completed - self._completed
+        row[column + 2] = completed
+        self._boarded = boarded
+        self._completed = completed
+
+    def flush(self) -> None:
+        """Append the buffered rows to the file, if there is one, and empty
+        the buffer.
+        """
+        if self.path is None or self._rows == 0:
+            return
+        with open(self.path, 'a') as out:
+            np.savetxt(out, self._buffer[:self._rows], fmt='%d',
+                       delimiter=',')
+        self._rows = 0
+
+    def rows(self) -> np.ndarray:
+        """Return a copy of the rows held in memory, oldest first: the rows
+        not yet flushed, or without a file, the latest chunk_size rows.
+        """
+        if self._rows <= self.chunk_size:
+            return self._buffer[:self._rows].copy()
+        return np.roll(self._buffer, -(self._rows % self.chunk_size), axis=0)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['entities', 'numpy'],
+        'max-nested-blocks': 4
+    })
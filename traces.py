@@ -0,0 +1,127 @@
+"""CSC148 Assignment 1 - Binary Arrival Traces
+
+=== Module Description ===
+
+This file defines a compact binary format for arrival traces, and converts
+the CSV arrival files read by FileArrivals into it. MappedFileArrivals (in
+algorithms.py) replays a binary trace by memory-mapping it, so that opening
+even a very large trace costs almost nothing.
+
+A trace file is little-endian, whatever machine wrote it, and holds in order:
+    - a header: the magic bytes b'ELVTRACE', the format version (uint32),
+      4 bytes of padding, the number of arrivals N (uint64) and the largest
+      round number R (uint64);
+    - the round index: R + 2 uint64 offsets, where the arrivals of round r
+      are those numbered offsets[r] up to (but not including) offsets[r + 1];
+    - three int32 columns of N values each: the round, the start floor and
+      the target floor of every arrival, sorted by round.
+
+Run this file to convert a CSV file from the command line, e.g.
+    python traces.py arrivals.csv arrivals.trace
+"""
+from array import array
+import csv
+import struct
+import sys
+from typing import Sequence, Tuple
+
+MAGIC = b'ELVTRACE'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQ')
+
+
+def read_header(data: bytes) -> Tuple[int, int]:
+    """Return the number of arrivals and the largest round number of the
+    trace whose contents start with <data>.
+
+    Raise ValueError if <data> does not start with a trace header.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('not an arrival trace: file too short')
+    magic, version, _, num_arrivals, max_round = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('not an arrival trace: bad magic bytes')
+    if version != VERSION:
+        raise ValueError(f'unsupported arrival trace version {version}')
+    return num_arrivals, max_round
+
+
+def column_offsets(num_arrivals: int, max_round: int) -> Tuple[int, int,
+                                                               int, int]:
+    """Return the byte offsets of the round index and of the round, start
+    and target columns of a trace with the given sizes.
+    """
+    index = HEADER.size
+    rounds = index + 8 * (max_round + 2)
+    starts = rounds + 4 * num_arrivals
+    targets = starts + 4 * num_arrivals
+    return index, rounds, starts, targets
+
+
+def read_column(data: memoryview, typecode: str) -> Sequence[int]:
+    """Return the little-endian integers of <data> (of the array typecode
+    <typecode>) in this machine's byte order.
+
+    On a little-endian machine this is a zero-copy view of <data>; on a
+    big-endian one it is a byteswapped copy.
+    """
+    if sys.byteorder == 'little':
+        return data.cast(typecode)
+    column = array(typecode)
+    column.frombytes(data)
+    column.byteswap()
+    return column
+
+
+def convert_csv(csv_filename: str, trace_filename: str) -> int:
+    """Convert the CSV arrival file <csv_filename> (in the format read by
+    FileArrivals) into the binary trace <trace_filename>.
+
+    Lines of the CSV file need not be sorted by round; lines that share a
+    round are combined. Return the number of arrivals written.
+
+    Raise ValueError if a line has a negative round or an odd number of
+    floors.
+    """
+    rounds, starts, targets = array('i'), array('i'), array('i')
+    in_order = True
+    with open(csv_filename) as csvfile:
+        for line in csv.reader(csvfile):
+            int_list = [int(item) for item in line]
+            round_num, floors = int_list[0], int_list[1:]
+            if round_num < 0 or len(floors) % 2 != 0:
+                raise ValueError(f'{csv_filename}: invalid line {line}')
+            if rounds and round_num < rounds[-1]:
+                in_order = False
+            rounds.extend([round_num] * (len(floors) // 2))
+            starts.extend(floors[0::2])
+            targets.extend(floors[1::2])
+
+    if not in_order:
+        # A stable sort keeps the arrivals of each round in file order.
+        order = sorted(range(len(rounds)), key=rounds.__getitem__)
+        rounds = array('i', (rounds[i] for i in order))
+        starts = array('i', (starts[i] for i in order))
+        targets = array('i', (targets[i] for i in order))
+
+    max_round = rounds[-1] if rounds else 0
+    offsets = array('Q', [0] * (max_round + 2))
+    for round_num in rounds:
+        offsets[round_num + 1] += 1
+    for r in range(1, max_round + 2):
+        offsets[r] += offsets[r - 1]
+
+    with open(trace_filename, 'wb') as trace:
+        trace.write(HEADER.pack(MAGIC, VERSION, 0, len(rounds), max_round))
+        for column in (offsets, rounds, starts, targets):
+            if sys.byteorder == 'big':
+                column.byteswap()
+            column.tofile(trace)
+    return len(rounds)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit('usage: python traces.py ARRIVALS.csv ARRIVALS.trace')
+    print(f'Wrote {convert_csv(sys.argv[1], sys.argv[2])} arrivals to '
+          f'{sys.argv[2]}')
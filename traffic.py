@@ -0,0 +1,376 @@
+"""CSC148 Assignment 1 - Bulk Traffic Generation
+
+=== Module Description ===
+
+This file contains arrival generators for load testing and for realistic
+traffic, which draw the arrivals of many rounds at once with NumPy instead of
+one person at a time.
+
+PoissonArrivals draws arrivals from a mix of TrafficPatterns, each a Poisson
+rate curve together with an origin-destination (od) matrix. The functions at
+the end of this file build common od matrices and rate curves, such as the
+morning up-peak, lunch and evening down-peak of an office day.
+
+Every generator here also provides arrivals(round_num), which returns the
+start and target floors of a round as arrays. BatchSimulation uses these
+arrays directly, without creating any Person objects.
+"""
+import random
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from algorithms import ArrivalGenerator
+from entities import Person, PersonStore
+
+
+class BulkRandomArrivals(ArrivalGenerator):
+    """Generate a fixed number of random people each round, drawing a block
+    of rounds at a time.
+
+    With distinct_starts set (the default), each round's people start on
+    different floors, as with RandomArrivals, so at most max_floor people
+    arrive per round. Otherwise start floors are drawn independently, and
+    any number of people may arrive each round.
+
+    A person's target floor is drawn uniformly from the floors other than
+    their start floor, without rejection.
+
+    Blocks are seeded from self.rng, so seeding a simulation seeds this
+    generator too. The arrivals of a round depend only on the seed and on
+    the round the block containing it started at, not on how many rounds of
+    the block were used.
+
+    === Attributes ===
+    block_size: the number of rounds drawn at a time
+    distinct_starts: whether the people arriving in a round all start on
+                     different floors
+
+    === Private Attributes ===
+    _block_start: the first round of the current block
+    _starts: the start floors of the current block, shape
+             (block_size, num_people)
+    _targets: the target floors of the current block, shape
+              (block_size, num_people)
+
+    === Representation Invariants ===
+    block_size >= 1
+    """
+    block_size: int
+    distinct_starts: bool
+    _block_start: int
+    _starts: np.ndarray
+    _targets: np.ndarray
+
+    def __init__(self, max_floor: int, num_people: Optional[int],
+                 rng: Optional[random.Random] = None, block_size: int = 256,
+                 distinct_starts: bool = True) -> None:
+        """Initialize a new BulkRandomArrivals algorithm.
+
+        Preconditions:
+            max_floor >= 2
+            num_people is None or num_people >= 0
+            block_size >= 1
+        """
+        ArrivalGenerator.__init__(self, max_floor, num_people, rng)
+        if not distinct_starts:
+            self.num_people = num_people
+        self.block_size = block_size
+        self.distinct_starts = distinct_starts
+        self._block_start = 0
+        self._starts = np.zeros((0, 0), dtype=np.int32)
+        self._targets = self._starts
+
+    def arrivals(self, round_num: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the start floors and target floors of the people arriving
+        at <round_num>.
+        """
+        offset = round_num - self._block_start
+        if not 0 <= offset < len(self._starts):
+            self._draw_block(round_num)
+            offset = 0
+        return self._starts[offset], self._targets[offset]
+
+    def generate(self, round_num: int) -> Dict[int, List[Person]]:
+        """Return the people arriving at <round_num>, grouped by start floor.
+        """
+        starts, targets = self.arrivals(round_num)
+        return _group_by_start(starts, targets, self.store)
+
+    def next_arrival(self, round_num: int) -> Optional[int]:
+        """Return <round_num> if people arrive every round, or None if they
+        never do.
+        """
+        return round_num if self.num_people else None
+
+    def _draw_block(self, round_num: int) -> None:
+        """Draw the arrivals of the block of rounds starting at <round_num>.
+        """
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        shape = (self.block_size, self.num_people or 0)
+        if self.distinct_starts:
+            keys = rng.random((self.block_size, self.max_floor))
+            starts = np.argsort(keys, axis=1)[:, :shape[1]] + 1
+        else:
+            starts = rng.integers(1, self.max_floor + 1, size=shape)
+        # Draw from the other floors without rejection.
+        targets = rng.integers(1, self.max_floor, size=shape)
+        targets += targets >= starts
+        self._block_start = round_num
+        self._starts = starts.astype(np.int32)
+        self._targets = targets.astype(np.int32)
+
+
+class TrafficPattern:
+    """One stream of Poisson arrivals: how many people arrive each round,
+    and where they go.
+
+    The number of people arriving at round r is Poisson distributed with
+    mean rates[r % len(rates)], so the rate curve repeats with a period of
+    len(rates) rounds (for example, one simulated day). Each person's start
+    and target floors are drawn with probability proportional to the entry
+    of od for that pair of floors.
+
+    === Attributes ===
+    rates: the mean number of arrivals in each round of a period
+    od: the origin-destination weights, where od[i - 1, j - 1] is the weight
+        of people going from floor i to floor j
+
+    === Representation Invariants ===
+    every rate is >= 0
+    od is square, with non-negative entries, a zero diagonal and at least
+    one positive entry
+    """
+    rates: np.ndarray
+    od: np.ndarray
+
+    def __init__(self, rates: Union[float, Sequence[float]],
+                 od: Sequence[Sequence[float]]) -> None:
+        """Initialize a new TrafficPattern.
+
+        The diagonal of <od> is ignored, since nobody travels to their own
+        floor.
+
+        Raise ValueError if a rate is negative, or if <od> is not a square
+        matrix of non-negative weights with a positive entry off its
+        diagonal.
+        """
+        self.rates = np.atleast_1d(np.asarray(rates, dtype=np.float64))
+        self.od = np.array(od, dtype=np.float64)
+        if self.rates.ndim != 1 or len(self.rates) == 0 or \
+                (self.rates < 0).any():
+            raise ValueError('rates must be one or more non-negative numbers')
+        if self.od.ndim != 2 or self.od.shape[0] != self.od.shape[1] or \
+                (self.od < 0).any():
+            raise ValueError('od must be a square matrix of non-negative '
+                             'weights')
+        np.fill_diagonal(self.od, 0)
+        if not self.od.any():
+            raise ValueError('od must have a positive weight between two '
+                             'different floors')
+
+
+class PoissonArrivals(ArrivalGenerator):
+    """Generate Poisson arrivals from a mix of traffic patterns, drawing a
+    block of rounds at a time.
+
+    Each pattern is an independent stream of arrivals; the people arriving
+    in a round are those of every pattern, in the order the patterns are
+    given. Blocks are seeded from self.rng, like BulkRandomArrivals.
+
+    === Attributes ===
+    patterns: the traffic patterns arrivals are drawn from
+    block_size: the number of rounds drawn at a time
+
+    === Private Attributes ===
+    _block_start: the first round of the current block
+    _offsets: the arrivals of round _block_start + i are those numbered
+              _offsets[i] up to (but not including) _offsets[i + 1]
+    _starts: the start floors of the arrivals of the current block
+    _targets: the target floors of the arrivals of the current block
+
+    === Representation Invariants ===
+    every pattern's od matrix is max_floor by max_floor
+    block_size >= 1
+    """
+    patterns: List[TrafficPattern]
+    block_size: int
+    _block_start: int
+    _offsets: np.ndarray
+    _starts: np.ndarray
+    _targets: np.ndarray
+
+    def __init__(self, max_floor: int, patterns: List[TrafficPattern],
+                 rng: Optional[random.Random] = None,
+                 block_size: int = 1024) -> None:
+        """Initialize a new PoissonArrivals algorithm.
+
+        Raise ValueError if a pattern is not for a building of <max_floor>
+        floors.
+
+        Preconditions:
+            max_floor >= 2
+            block_size >= 1
+        """
+        ArrivalGenerator.__init__(self, max_floor, None, rng)
+        for pattern in patterns:
+            if pattern.od.shape != (max_floor, max_floor):
+                raise ValueError(f'od matrix of shape {pattern.od.shape} '
+                                 f'does not fit {max_floor} floors')
+        self.patterns = patterns
+        self.block_size = block_size
+        self._block_start = 0
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._starts = np.zeros(0, dtype=np.int32)
+        self._targets = self._starts
+
+    def arrivals(self, round_num: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the start floors and target floors of the people arriving
+        at <round_num>.
+        """
+        offset = round_num - self._block_start
+        if not 0 <= offset < len(self._offsets) - 1:
+            self._draw_block(round_num)
+            offset = 0
+        lo, hi = self._offsets[offset], self._offsets[offset + 1]
+        return self._starts[lo:hi], self._targets[lo:hi]
+
+    def generate(self, round_num: int) -> Dict[int, List[Person]]:
+        """Return the people arriving at <round_num>, grouped by start floor.
+        """
+        starts, targets = self.arrivals(round_num)
+        return _group_by_start(starts, targets, self.store)
+
+    def next_arrival(self, round_num: int) -> Optional[int]:
+        """Return the first round at or after <round_num> with arrivals, or
+        None if no pattern ever has a positive rate.
+
+        Blocks are drawn in the same order as when every round is
+        generated, so skipping rounds does not change the arrivals.
+        """
+        if not any(pattern.rates.any() for pattern in self.patterns):
+            return None
+        while True:
+            offset = round_num - self._block_start
+            if not 0 <= offset < len(self._offsets) - 1:
+                self._draw_block(round_num)
+                offset = 0
+            last = np.searchsorted(self._offsets, self._offsets[offset],
+                                   side='right') - 1
+            if last < len(self._offsets) - 1:
+                return self._block_start + int(last)
+            round_num = self._block_start + len(self._offsets) - 1
+
+    def _draw_block(self, round_num: int) -> None:
+        """Draw the arrivals of the block of rounds starting at <round_num>.
+        """
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        rounds = np.arange(round_num, round_num + self.block_size)
+        block_rounds, pairs = [], []
+        for pattern in self.patterns:
+            counts = rng.poisson(pattern.rates[rounds % len(pattern.rates)])
+            cdf = np.cumsum(pattern.od.ravel())
+            draws = rng.random(counts.sum()) * cdf[-1]
+            pair = np.searchsorted(cdf, draws, side='right')
+            # Guard against rounding at the top of the last positive entry.
+            pairs.append(np.minimum(pair, np.flatnonzero(pattern.od)[-1]))
+            block_rounds.append(np.repeat(np.arange(self.block_size), counts))
+
+        # A stable sort by round keeps each round's patterns in order.
+        block_round = np.concatenate(block_rounds)
+        order = np.argsort(block_round, kind='stable')
+        pair = np.concatenate(pairs)[order]
+        self._block_start = round_num
+        self._offsets = np.zeros(self.block_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(block_round, minlength=self.block_size),
+                  out=self._offsets[1:])
+        self._starts = (pair // self.max_floor + 1).astype(np.int32)
+        self._targets = (pair % self.max_floor + 1).astype(np.int32)
+
+
+def uniform_od(max_floor: int) -> np.ndarray:
+    """Return the od matrix of interfloor traffic, where every trip between
+    two different floors is equally likely.
+    """
+    return np.ones((max_floor, max_floor)) - np.eye(max_floor)
+
+
+def up_peak_od(max_floor: int, lobby: int = 1) -> np.ndarray:
+    """Return the od matrix of up-peak traffic, where everyone starts at
+    <lobby> and goes to one of the other floors.
+    """
+    od = np.zeros((max_floor, max_floor))
+    od[lobby - 1] = 1
+    return od
+
+
+def down_peak_od(max_floor: int, lobby: int = 1) -> np.ndarray:
+    """Return the od matrix of down-peak traffic, where everyone goes from
+    one of the other floors to <lobby>.
+    """
+    return up_peak_od(max_floor, lobby).T
+
+
+def peak_rates(rounds_per_day: int, centre: float, width: float,
+               peak_rate: float) -> np.ndarray:
+    """Return the rates of a bell-shaped peak over a day of <rounds_per_day>
+    rounds, reaching <peak_rate> at round <centre>.
+
+    <width> is the standard deviation of the peak, in rounds.
+    """
+    rounds = np.arange(rounds_per_day)
+    return peak_rate * np.exp(-0.5 * ((rounds - centre) / width) ** 2)
+
+
+def office_day(max_floor: int, rounds_per_day: int, peak_rate: float,
+               base_rate: float = 0.0, lobby: int = 1) -> List[TrafficPattern]:
+    """Return the traffic patterns of a day in an office building.
+
+    A day has a morning up-peak from <lobby>, a lunch peak to and from
+    <lobby> and an evening down-peak to <lobby>, each reaching <peak_rate>
+    arrivals per round (split evenly between the two directions at lunch),
+    with interfloor traffic of <base_rate> arrivals per round all day.
+    """
+    day = rounds_per_day
+    width = day / 48
+    patterns = [
+        TrafficPattern(peak_rates(day, day * 9 / 24, width, peak_rate),
+                       up_peak_od(max_floor, lobby)),
+        TrafficPattern(peak_rates(day, day * 12 / 24, width, peak_rate / 2),
+                       down_peak_od(max_floor, lobby)),
+        TrafficPattern(peak_rates(day, day * 13 / 24, width, peak_rate / 2),
+                       up_peak_od(max_floor, lobby)),
+        TrafficPattern(peak_rates(day, day * 17 / 24, width, peak_rate),
+                       down_peak_od(max_floor, lobby))
+    ]
+    if base_rate > 0:
+        patterns.append(TrafficPattern(base_rate, uniform_od(max_floor)))
+    return patterns
+
+
+def _group_by_start(starts: np.ndarray, targets: np.ndarray,
+                    store: PersonStore) -> Dict[int, List[Person]]:
+    """Return a new person for every pair of <starts> and <targets>, grouped
+    by start floor.
+
+    The people are allocated together in <store>. People starting on the
+    same floor keep their order in <starts>.
+    """
+    starts = starts.tolist()
+    indices = store.allocate_many(starts, targets.tolist())
+    people = {}
+    for start, index in zip(starts, indices):
+        person = Person.from_record(store, index)
+        if start in people:
+            people[start].append(person)
+        else:
+            people[start] = [person]
+    return people
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['algorithms', 'entities', 'numpy', 'random'],
+        'max-nested-blocks': 4
+    })
@@ -10,17 +10,30 @@ This file contains the Visualizer class, which is responsible for interacting
 with Pygame, the graphics library we're using for this assignment.
 There's quite a bit in this file, but you aren't responsible for most of it.
 
-DO NOT CHANGE ANY CODE IN THIS FILE. You don't need to for this assignment,
-and in fact you aren't even submitting this file!
+pygame and the sprite classes are only imported once a Visualizer is created
+with visualize=True, so a headless simulation never loads them. The Visualizer
+attaches one sprite to each elevator and person it is asked to show.
+
+Animations take a fixed time rather than a fixed number of frames: each frame
+shows the animation as far along as the time since it started, and frames are
+drawn at most FPS times per second. A slow frame therefore makes the next
+frames skip ahead instead of slowing the simulation down. All the people who
+get on or off elevators in a round walk together in one animation, shown just
+before the elevators move.
+
+A speed multiplier shortens every animation and pause. A visualizer can also
+fast-forward: it then draws nothing and keeps no sprites up to date, like a
+headless simulation, and catches up with the state of the simulation when it
+stops. While a simulation is shown, the F key toggles fast-forward and the
+up and down arrow keys double and halve the speed.
 """
 from __future__ import annotations
 import random
 import time
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
-import pygame
 from algorithms import Direction
-import sprites
+from entities import Elevator, Person, WaitingQueues
 
 
 # Colour constants
@@ -35,6 +48,10 @@ FLOOR_BORDER_HEIGHT = 10  # The height of the border
 # FPS based on config speed
 FPS = 60
 
+# The number of frames an animation lasts at normal speed, if every frame is
+# drawn on time
+ANIMATION_FRAMES = 20
+
 
 class Visualizer:
     """Visualizer for the current state of a simulation.
@@ -43,17 +60,47 @@ class Visualizer:
     understanding them, and they are left undocumented.
     """
     def __init__(self,
-                 elevators: List[sprites.ElevatorSprite],
+                 elevators: List[Elevator],
                  num_floors: int,
-                 visualize: bool) -> None:
+                 visualize: bool,
+                 waiting: Optional[WaitingQueues] = None,
+                 speed: float = 1.0) -> None:
         """Initialize this visualization.
 
-        If visualize is False, this instance does nothing.
+        <waiting> is the simulation's queues of waiting people, which are
+        shown again when a fast-forward stops; without it, people waiting
+        then are not shown until they board. Every animation and pause is
+        <speed> times faster than normal.
+
+        If visualize is False, this instance does nothing (and pygame is
+        never imported).
+
+        Precondition: speed > 0
         """
         self._visualize = visualize
         if not self._visualize:
             return
 
+        import pygame
+        import sprites
+        self._pygame = pygame
+        self._sprites = sprites
+        self._person_sprites = {}
+        self._elevator_sprites = {}
+        # Jitter uses its own generator so that visualizing a simulation does
+        # not change its random numbers.
+        self._rng = random.Random()
+
+        self._elevators = elevators
+        self._waiting = waiting
+        self._speed = speed
+        # The people walking on or off elevators in this round, shown
+        # together by _show_walks: (sprite, from x, to x, elevator, leaving)
+        self._walks = []
+        # The round fast-forwarding stops at (infinity until stopped by
+        # hand), or None when not fast-forwarding
+        self._fast_forward_until = None
+
         self._num_elevators = len(elevators)
         self._num_floors = num_floors
 
@@ -71,18 +118,89 @@ class Visualizer:
 
         self._setup_sprites(elevators)
         # Initial render.
+        self._last_frame = 0.0
+        self.render()
+
+    def set_speed(self, speed: float) -> None:
+        """Make every animation and pause <speed> times faster than normal.
+
+        Precondition: speed > 0
+        """
+        if self._visualize:
+            self._speed = speed
+
+    def fast_forward(self, until_round: Optional[int] = None) -> None:
+        """Stop showing the simulation until round <until_round> starts, or
+        until resume is called if <until_round> is None.
+        """
+        if not self._visualize:
+            return
+        self._show_walks()
+        self._fast_forward_until = \
+            float('inf') if until_round is None else until_round
+        self._show_status('Fast-forwarding...')
         self.render()
 
+    def resume(self) -> None:
+        """Stop fast-forwarding, and show the current state of the
+        simulation.
+        """
+        if not self._visualize or self._fast_forward_until is None:
+            return
+        self._fast_forward_until = None
+        for sprite in self._person_sprites.values():
+            sprite.kill()
+        self._person_sprites = {}
+
+        for elevator in self._elevators:
+            sprite = self._elevator_sprites[elevator]
+            sprite.rect.bottom = self.get_y_of_floor(elevator.floor)
+            sprite.update()
+            for passenger in elevator.passengers:
+                person_sprite = self._add_person(passenger,
+                                                 sprite.rect.bottom,
+                                                 sprite.rect.centerx)
+                person_sprite.rect.centerx += self._rng.randint(-3, 3)
+        if self._waiting is not None:
+            self.show_arrivals({floor: self._waiting[floor] for floor
+                                in self._waiting.nonempty_floors()})
+        self._render_if_due()
+
     def render_header(self, round_num: int) -> None:
         """Render text displaying the round number for this simulation."""
         if not self._visualize:
             return
+        self._handle_keys()
+        if self._fast_forward_until is not None:
+            if round_num < self._fast_forward_until:
+                return
+            self.resume()
+        self._show_walks()
+        self._show_status(f'Round {round_num}')
+        for sprite in self._person_sprites.values():
+            sprite.image = sprite.load_image()
+        self._render_if_due()
+
+    def _show_status(self, text: str) -> None:
+        """Replace the text at the top of the screen with <text>."""
         self._stats_group.remove(list(self._stats_group))
-        self._stats_group.add(sprites.StatLine(0, f'Round {round_num}'))
-        for sprite in self._sprite_group:
-            if isinstance(sprite, sprites.PersonSprite):
-                sprite.image = sprite.load_image()
-        self.render()
+        self._stats_group.add(self._sprites.StatLine(0, text))
+
+    def _handle_keys(self) -> None:
+        """Handle the keys pressed since the last call: F toggles
+        fast-forward, and the up and down arrows double and halve the speed.
+        """
+        pygame = self._pygame
+        for event in pygame.event.get(pygame.KEYDOWN):
+            if event.key == pygame.K_f:
+                if self._fast_forward_until is None:
+                    self.fast_forward()
+                else:
+                    self.resume()
+            elif event.key == pygame.K_UP:
+                self._speed *= 2
+            elif event.key == pygame.K_DOWN:
+                self._speed /= 2
 
     def _total_height(self) -> int:
         """Return the screen height for this visualization."""
@@ -104,95 +222,176 @@ class Visualizer:
             return
 
         # Need this on OSX due to pygame bug
-        pygame.event.peek(0)
+        self._pygame.event.peek(0)
 
         self._screen.fill(WHITE)
         self._sprite_group.draw(self._screen)
         self._stats_group.draw(self._screen)
         self._clock.tick(FPS)
-        pygame.display.flip()
+        self._pygame.display.flip()
+        self._last_frame = time.perf_counter()
+
+    def _render_if_due(self) -> None:
+        """Draw the current state of the simulation if the next frame is
+        due, without waiting for it otherwise.
+
+        Frames that are not due are skipped; the next frame drawn shows
+        their changes.
+        """
+        if not FPS or time.perf_counter() - self._last_frame >= 1 / FPS:
+            self.render()
 
-    def show_arrivals(self,
-                      arrivals: Dict[int, List[sprites.PersonSprite]]) -> None:
+    def show_arrivals(self, arrivals: Dict[int, List[Person]]) -> None:
         """Show new arrivals."""
-        if not self._visualize:
+        if not self._visualize or self._fast_forward_until is not None:
             return
 
         x = 10
         for floor, people in arrivals.items():
             y = self.get_y_of_floor(floor)
             for person in people:
-                person.rect.bottom = y
-                person.rect.centerx = x + random.randint(-3, 3)
-                self._sprite_group.add(person)
-        self.render()
-
-    def show_boarding(self, person: sprites.PersonSprite,
-                      elevator: sprites.ElevatorSprite) -> None:
+                if person in self._person_sprites:
+                    continue
+                sprite = self._add_person(person, y, x)
+                sprite.rect.centerx += self._rng.randint(-3, 3)
+        self._render_if_due()
+
+    def _add_person(self, person: Person, bottom: int,
+                    centerx: int) -> Any:
+        """Add and return a sprite for <person> at the given position."""
+        sprite = self._sprites.PersonSprite(person)
+        sprite.rect.bottom = bottom
+        sprite.rect.centerx = centerx
+        self._person_sprites[person] = sprite
+        self._sprite_group.add(sprite)
+        return sprite
+
+    def show_boarding(self, person: Person, elevator: Elevator) -> None:
         """Show boarding of the given person onto the given elevator.
 
+        The person walks onto the elevator together with everyone else who
+        gets on or off an elevator in this round.
+
         Precondition: the given person is on the same floor as the elevator.
         """
-        if not self._visualize:
+        if not self._visualize or self._fast_forward_until is not None:
             return
 
-        from_x = 10
-        target_x = elevator.rect.centerx + random.randint(-3, 3)
-
-        for frame in range(21):  # Move in 20 seconds
-            person.rect.centerx = from_x + (target_x - from_x) * frame // 20
-            self.render()
+        person_sprite = self._person_sprites.get(person)
+        if person_sprite is None:
+            # The person arrived while fast-forwarding without the waiting
+            # queues to show them.
+            person_sprite = self._add_person(
+                person, self.get_y_of_floor(elevator.floor), 10)
+        elevator_sprite = self._elevator_sprites[elevator]
+        target_x = elevator_sprite.rect.centerx + self._rng.randint(-3, 3)
+        self._walks.append((person_sprite, person_sprite.rect.centerx,
+                            target_x, elevator, False))
+
+    def show_disembarking(self, person: Person, elevator: Elevator) -> None:
+        """Show disembarking of the given person from the given elevator.
+
+        The person walks off the elevator together with everyone else who
+        gets on or off an elevator in this round, and is then no longer
+        shown.
+        """
+        if not self._visualize or self._fast_forward_until is not None:
+            return
 
-        elevator.update()
-        self.render()
+        person_sprite = self._person_sprites.pop(person)
+        self._walks.append((person_sprite, person_sprite.rect.centerx, 10,
+                            elevator, True))
 
-    def show_disembarking(self, person: sprites.PersonSprite,
-                          elevator: sprites.ElevatorSprite) -> None:
-        """Show disembarking of the given person from the given elevator."""
-        if not self._visualize:
+    def _show_walks(self) -> None:
+        """Show everyone who got on or off an elevator since the last call
+        walking there, all at once.
+        """
+        if not self._walks:
             return
+        walks, self._walks = self._walks, []
 
-        from_x = person.rect.centerx
-        target_x = 10
-
-        elevator.update()
+        def step(progress: float) -> None:
+            for sprite, from_x, target_x, _, _ in walks:
+                sprite.rect.centerx = \
+                    from_x + int((target_x - from_x) * progress)
 
-        for frame in range(21):  # Move in 20 seconds
-            x = from_x + (target_x - from_x) * frame // 20
-            person.rect.centerx = x
-            self.render()
+        self._animate(step)
+        for sprite, _, _, elevator, leaving in walks:
+            self._elevator_sprites[elevator].update()
+            if leaving:
+                sprite.kill()
+        self._render_if_due()
 
     def show_elevator_moves(self,
-                            elevators: List['Elevator'],
+                            elevators: List[Elevator],
                             directions: List[Direction]) -> None:
-        """Show elevator moves. Note that all the elevators move at once."""
-        if not self._visualize:
+        """Show elevator moves. Note that all the elevators move at once.
+
+        Each elevator is animated from where it was drawn to its current
+        floor, however many floors it moved. The people who got on or off
+        elevators in this round are shown first.
+        """
+        if not self._visualize or self._fast_forward_until is not None:
+            return
+        self._show_walks()
+
+        moves = []
+        for elevator, _ in zip(elevators, directions):
+            start = self._elevator_sprites[elevator].rect.bottom
+            distance = self.get_y_of_floor(elevator.floor) - start
+            if distance != 0:
+                moves.append((elevator, start, distance))
+        if not moves:
             return
 
-        for _ in range(20):  # Move in 20 seconds
-            for elevator, direction in zip(elevators, directions):
-                if direction == Direction.UP:
-                    step = - FLOOR_HEIGHT / 20
-                elif direction == Direction.DOWN:
-                    step = FLOOR_HEIGHT / 20
-                else:
-                    step = 0
-                elevator.rect.bottom += step
+        def step(progress: float) -> None:
+            for elevator, start, distance in moves:
+                sprite = self._elevator_sprites[elevator]
+                change = start + int(distance * progress) - sprite.rect.bottom
+                sprite.rect.bottom += change
                 for passenger in elevator.passengers:
-                    passenger.rect.bottom += step
+                    self._person_sprites[passenger].rect.bottom += change
+
+        self._animate(step)
 
+    def _animate(self, step: Callable[[float], None]) -> None:
+        """Show an animation, calling <step> with how far along it is (from
+        0 to 1) before drawing each frame.
+
+        The animation lasts ANIMATION_FRAMES / FPS seconds at normal speed,
+        however long each frame takes to draw. An animation shorter than a
+        frame is skipped, and its end shown in the next frame drawn.
+        """
+        duration = ANIMATION_FRAMES / FPS / self._speed if FPS else 0
+        if duration <= 1 / (FPS or 1):
+            step(1.0)
+            self._render_if_due()
+            return
+        start = time.perf_counter()
+        progress = 0.0
+        while progress < 1:
+            step(progress)
             self.render()
+            progress = min((time.perf_counter() - start) / duration, 1.0)
+        step(1.0)
+        self.render()
 
     def wait(self, wait_time: int) -> None:
-        """Wait for the specified amount of time, in seconds.
+        """Wait for the specified amount of time, in seconds, divided by the
+        speed.
 
-        Only occurs if self.visualize is true, otherwise there's no need to
+        The current state is drawn first, and the time taken to draw it
+        counts towards the wait. Only occurs if self.visualize is true and
+        this visualizer is not fast-forwarding, otherwise there's no need to
         wait.
         """
-        if self._visualize:
-            time.sleep(wait_time)
+        if self._visualize and self._fast_forward_until is None:
+            end = time.perf_counter() + wait_time / self._speed
+            self._show_walks()
+            self.render()
+            time.sleep(max(end - time.perf_counter(), 0))
 
-    def _setup_sprites(self, elevators: List[sprites.ElevatorSprite]) -> None:
+    def _setup_sprites(self, elevators: List[Elevator]) -> None:
         """Set up the initial sprites for this visualization.
 
         Position them on the screen and spaces them based on:
@@ -201,22 +400,25 @@ class Visualizer:
         """
         for i in range(1, self._num_floors + 1):
             y = self.get_y_of_floor(i)
-            floor = sprites.FloorSprite(WIDTH, FLOOR_HEIGHT, y)
-            floor_num = sprites.FloorNum(y - 20, str(i))
+            floor = self._sprites.FloorSprite(WIDTH, FLOOR_HEIGHT, y)
+            floor_num = self._sprites.FloorNum(y - 20, str(i))
             self._sprite_group.add(floor_num)
             self._sprite_group.add(floor)
 
         for i, elevator in enumerate(elevators):
-            elevator.rect.centerx =\
+            sprite = self._sprites.ElevatorSprite(elevator)
+            sprite.rect.centerx =\
                 (i + 1) * WIDTH // (self._num_elevators + 1)
-            elevator.rect.bottom = self._total_height() - FLOOR_BORDER_HEIGHT
+            sprite.rect.bottom = self._total_height() - FLOOR_BORDER_HEIGHT
 
-            self._sprite_group.add(elevator)
+            self._elevator_sprites[elevator] = sprite
+            self._sprite_group.add(sprite)
 
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['random', 'pygame', 'time', 'algorithms'],
+        'extra-imports': ['random', 'pygame', 'time', 'algorithms',
+                          'entities', 'sprites'],
         'generated-members': 'pygame.*'
     })